@@ -15,4 +15,12 @@ class NewsInputModel(BaseModel):
 class NewsInsertResultModel(BaseModel):
     news_id: int = Field(description="News ID")
     cluster_id: int = Field(description="Cluster ID")
-    created: bool = Field(description="Created", default=False)
\ No newline at end of file
+    created: bool = Field(description="Created", default=False)
+
+
+class NewsBatchInputModel(BaseModel):
+    items: List[NewsInputModel] = Field(description="News to save, in order")
+
+
+class NewsBatchResultModel(BaseModel):
+    items: List[NewsInsertResultModel] = Field(description="Insert results in the order of input items")
\ No newline at end of file
@@ -2,14 +2,21 @@ import random
 
 from fastapi import APIRouter
 
-from api.models import NewsInputModel, NewsInsertResultModel
+from api.models import NewsBatchInputModel, NewsBatchResultModel, NewsInputModel, NewsInsertResultModel
 
 router = APIRouter(prefix="/test", tags=["test-news"])
 
-@router.post(path="/save_news", name="test:save_news", description="Test POST request", response_model=NewsInsertResultModel)
-async def randomizer(news: NewsInputModel):
+def _random_result() -> NewsInsertResultModel:
     return NewsInsertResultModel(
         news_id=random.randint(1, 100),
         cluster_id=random.randint(1, 100),
         created=random.random() < 0.7
-    )
\ No newline at end of file
+    )
+
+@router.post(path="/save_news", name="test:save_news", description="Test POST request", response_model=NewsInsertResultModel)
+async def randomizer(news: NewsInputModel):
+    return _random_result()
+
+@router.post(path="/save_news_batch", name="test:save_news_batch", description="Test batch POST request", response_model=NewsBatchResultModel)
+async def batch_randomizer(batch: NewsBatchInputModel):
+    return NewsBatchResultModel(items=[_random_result() for _ in batch.items])
\ No newline at end of file
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import argparse
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable
+
+from bs4 import BeautifulSoup
+
+from lenta.lenta_parser import config as lenta_config
+from lenta.lenta_parser import lenta_politic
+from ria.ria_parser import config as ria_config
+from ria.ria_parser import ria_politics
+
+
+PAGES_DIR = Path(__file__).resolve().parent / "bench_pages"
+
+
+def _soup_news_urls(module) -> Callable[[str, object], list[str]]:
+    """Reference extraction over a full BeautifulSoup tree, as the parsers did before."""
+
+    def extract(html: str, config) -> list[str]:
+        soup = BeautifulSoup(html, "html.parser")
+        return module._unique_news_urls((link.get("href") for link in soup.find_all("a", href=True)), config)
+
+    return extract
+
+
+def _measure(func: Callable[[str, object], list[str]], html: str, config, repeat: int) -> tuple[float, int]:
+    started = time.process_time()
+    for _ in range(repeat):
+        func(html, config)
+    cpu_ms = (time.process_time() - started) * 1000 / repeat
+
+    tracemalloc.start()
+    func(html, config)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return cpu_ms, peak
+
+
+def _bench(name: str, html: str, config, module, repeat: int) -> None:
+    soup = _soup_news_urls(module)
+    fast = module.extract_news_urls(html, config)
+    reference = soup(html, config)
+    if fast != reference:
+        raise SystemExit(f"{name}: link lists differ ({len(fast)} vs {len(reference)})")
+
+    soup_cpu, soup_peak = _measure(soup, html, config, repeat)
+    fast_cpu, fast_peak = _measure(module.extract_news_urls, html, config, repeat)
+    print(f"{name}: {len(html) / 1024:.0f} KiB page, {len(fast)} links (identical)")
+    print(f"  soup  : {soup_cpu:8.2f} ms cpu  {soup_peak / 1024:8.0f} KiB peak")
+    print(f"  stream: {fast_cpu:8.2f} ms cpu  {fast_peak / 1024:8.0f} KiB peak")
+    print(f"  saving: {soup_cpu / fast_cpu:.1f}x cpu, {soup_peak / max(fast_peak, 1):.1f}x memory")
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark section link extraction (soup vs stream)")
+    parser.add_argument(
+        "--lenta", type=Path, default=PAGES_DIR / "lenta_section.html", help="Stored Lenta section page"
+    )
+    parser.add_argument("--ria", type=Path, default=PAGES_DIR / "ria_section.html", help="Stored RIA section page")
+    parser.add_argument("--repeat", type=int, default=20, help="Runs per implementation")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = _parse_args()
+
+    html = args.lenta.read_text(encoding="utf-8")
+    _bench("lenta", html, lenta_config.get_config(), lenta_politic, args.repeat)
+
+    html = args.ria.read_text(encoding="utf-8")
+    _bench("ria", html, ria_config.get_config(), ria_politics, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
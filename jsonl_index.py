@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import argparse
+import json
+import mmap
+import os
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator
+
+from timestamps import utc_stamp
+
+
+INDEX_SUFFIX = ".idx"
+_SEPARATOR = "\t"
+_TAIL_BYTES = 4096
+
+
+def index_path_for(path: Path) -> Path:
+    path = Path(path)
+    return path.with_name(path.name + INDEX_SUFFIX)
+
+
+def index_entry(offset: int, length: int, record: dict | None) -> str:
+    """One sidecar line: byte offset, byte length, UTC date and source of a record."""
+    record = record if isinstance(record, dict) else {}
+    source = str(record.get("source_name") or "").replace(_SEPARATOR, " ").replace("\n", " ")
+    return f"{offset}{_SEPARATOR}{length}{_SEPARATOR}{utc_stamp(record.get('date'))}{_SEPARATOR}{source}\n"
+
+
+def _parse_entry(line: str) -> tuple[int, int, str, str] | None:
+    parts = line.rstrip("\n").split(_SEPARATOR, 3)
+    if len(parts) != 4:
+        return None
+    try:
+        return int(parts[0]), int(parts[1]), parts[2], parts[3]
+    except ValueError:
+        return None
+
+
+def _last_indexed_end(index_path: Path) -> int | None:
+    """End offset of the last complete sidecar entry, read from the file tail only."""
+    if not index_path.exists():
+        return 0
+    with index_path.open("rb") as handle:
+        handle.seek(0, os.SEEK_END)
+        size = handle.tell()
+        if size == 0:
+            return 0
+        handle.seek(max(size - _TAIL_BYTES, 0))
+        tail = handle.read()
+    if not tail.endswith(b"\n"):
+        return None
+    entry = _parse_entry(tail.rstrip(b"\n").rsplit(b"\n", 1)[-1].decode("utf-8", errors="replace"))
+    if entry is None:
+        return None
+    return entry[0] + entry[1]
+
+
+def reconcile_index(path: Path, index_path: Path | None = None) -> int:
+    """Bring the sidecar in line with the data file after a crash or for a new file.
+
+    Entries pointing past the end of the data are dropped and records not
+    yet indexed are appended. Returns how many entries were added. In the
+    usual case only the last few KiB of the sidecar are read.
+    """
+    path = Path(path)
+    index_path = index_path or index_path_for(path)
+    data_size = path.stat().st_size if path.exists() else 0
+    indexed_end = _last_indexed_end(index_path)
+    if indexed_end == data_size:
+        return 0
+
+    kept: list[str] = []
+    indexed_end = 0
+    if index_path.exists():
+        with index_path.open("r", encoding="utf-8") as handle:
+            for line in handle:
+                entry = _parse_entry(line)
+                if entry is None or not line.endswith("\n") or entry[0] + entry[1] > data_size:
+                    break
+                kept.append(line)
+                indexed_end = entry[0] + entry[1]
+
+    added = 0
+    if data_size > indexed_end:
+        with path.open("rb") as handle:
+            handle.seek(indexed_end)
+            offset = indexed_end
+            for raw in handle:
+                if not raw.endswith(b"\n"):
+                    break
+                try:
+                    record = json.loads(raw)
+                except json.JSONDecodeError:
+                    record = None
+                kept.append(index_entry(offset, len(raw), record))
+                offset += len(raw)
+                added += 1
+
+    tmp_path = index_path.with_name(index_path.name + ".tmp")
+    with tmp_path.open("w", encoding="utf-8") as handle:
+        handle.writelines(kept)
+        handle.flush()
+        os.fsync(handle.fileno())
+    os.replace(tmp_path, index_path)
+    return added
+
+
+def iter_matches(
+    path: Path,
+    source: str | None = None,
+    since: datetime | str | None = None,
+    until: datetime | str | None = None,
+    start_offset: int = 0,
+) -> Iterator[tuple[int, int, dict]]:
+    """``(offset, length, record)`` of matching records at or after ``start_offset``, in file order.
+
+    Filtering happens on the sidecar; only matching records are sliced out
+    of the memory-mapped data file and decoded.
+    """
+    path = Path(path)
+    index_path = index_path_for(path)
+    if not index_path.exists():
+        reconcile_index(path, index_path)
+    low = utc_stamp(since) if since is not None else ""
+    high = utc_stamp(until) if until is not None else ""
+    if not path.exists() or path.stat().st_size == 0:
+        return
+
+    with path.open("rb") as data, index_path.open("r", encoding="utf-8") as index:
+        with mmap.mmap(data.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            size = len(view)
+            for line in index:
+                entry = _parse_entry(line)
+                if entry is None:
+                    continue
+                offset, length, date, entry_source = entry
+                if offset < start_offset:
+                    continue
+                if source is not None and entry_source != source:
+                    continue
+                if low and (not date or date < low):
+                    continue
+                if high and (not date or date > high):
+                    continue
+                if offset + length > size:
+                    break
+                yield offset, length, json.loads(view[offset:offset + length])
+
+
+def query(
+    path: Path,
+    source: str | None = None,
+    since: datetime | str | None = None,
+    until: datetime | str | None = None,
+) -> Iterator[dict]:
+    """Records of ``path`` matching source and [since, until], in file order."""
+    for _, _, record in iter_matches(path, source, since, until):
+        yield record
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Range queries over a parser JSONL file via its offset index")
+    parser.add_argument("path", type=str, help="JSONL data file")
+    parser.add_argument("--source", type=str, help="Exact source_name to select")
+    parser.add_argument("--since", type=str, help="Lower date bound, ISO format (naive means UTC)")
+    parser.add_argument("--until", type=str, help="Upper date bound, ISO format (naive means UTC)")
+    parser.add_argument("--reindex", action="store_true", help="Build or repair the .idx sidecar before querying")
+    parser.add_argument("--count", action="store_true", help="Print only the number of matching records")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = _parse_args()
+    if args.reindex:
+        added = reconcile_index(Path(args.path))
+        print(f"indexed {added} records", file=sys.stderr)
+    matches = query(Path(args.path), args.source, args.since, args.until)
+    if args.count:
+        print(sum(1 for _ in matches))
+        return 0
+    for record in matches:
+        sys.stdout.write(json.dumps(record, ensure_ascii=False))
+        sys.stdout.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import atexit
+import json
+import os
+import signal
+import sys
+import threading
+from pathlib import Path
+
+from jsonl_index import index_entry, index_path_for, reconcile_index
+
+
+MODE_ALWAYS = "always"
+MODE_BATCH = "batch"
+MODE_FLUSH = "flush"
+MODES = (MODE_ALWAYS, MODE_BATCH, MODE_FLUSH)
+
+
+class JsonlWriter:
+    """Append-only JSONL writer that keeps its file open and group-commits fsyncs.
+
+    Durability modes:
+      ``always`` - flush and fsync after every record (the old behaviour);
+      ``batch``  - fsync once ``fsync_every`` records are pending, and every
+                   ``fsync_interval`` seconds while any are;
+      ``flush``  - hand every record to the OS, fsync only on close.
+
+    With ``index=True`` a ``.idx`` sidecar (byte offset, length, date, source
+    per record) is appended alongside; see jsonl_index for the reader.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        mode: str = MODE_BATCH,
+        fsync_every: int = 100,
+        fsync_interval: float = 1.0,
+        index: bool = False,
+    ) -> None:
+        if mode not in MODES:
+            raise ValueError(f"Unknown fsync mode {mode!r}, expected one of {MODES}")
+        self.path = Path(path)
+        self.mode = mode
+        self._fsync_every = max(fsync_every, 1)
+        self._fsync_interval = max(fsync_interval, 0.01)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._closed = threading.Event()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._index_handle = None
+        if index:
+            index_path = index_path_for(self.path)
+            reconcile_index(self.path, index_path)
+            self._index_handle = index_path.open("a", encoding="utf-8")
+        self._handle = self.path.open("a", encoding="utf-8")
+        self._offset = self.path.stat().st_size
+        self._syncer: threading.Thread | None = None
+        if mode == MODE_BATCH:
+            self._syncer = threading.Thread(target=self._sync_loop, name=f"fsync-{self.path.name}", daemon=True)
+            self._syncer.start()
+
+    def write(self, record: dict) -> None:
+        self.write_line(json.dumps(record, ensure_ascii=False) + "\n", record)
+
+    def write_line(self, line: str, record: dict | None = None) -> None:
+        """Append an already serialized, newline-terminated record."""
+        with self._lock:
+            if self._handle.closed:
+                raise ValueError(f"Writer for {self.path} is closed")
+            self._handle.write(line)
+            if self._index_handle is not None:
+                length = len(line.encode("utf-8"))
+                self._index_handle.write(index_entry(self._offset, length, record))
+                self._offset += length
+            self._pending += 1
+            if self.mode == MODE_ALWAYS or (self.mode == MODE_BATCH and self._pending >= self._fsync_every):
+                self._sync_locked()
+            elif self.mode == MODE_FLUSH:
+                self._flush_locked()
+
+    def sync(self) -> None:
+        with self._lock:
+            if not self._handle.closed:
+                self._sync_locked()
+
+    def close(self) -> None:
+        self._closed.set()
+        with self._lock:
+            if self._handle.closed:
+                return
+            self._sync_locked()
+            self._handle.close()
+            if self._index_handle is not None:
+                self._index_handle.close()
+
+    def _flush_locked(self) -> None:
+        # Data before index; reconcile_index drops entries a crash left past the data.
+        self._handle.flush()
+        if self._index_handle is not None:
+            self._index_handle.flush()
+
+    def _sync_locked(self) -> None:
+        self._flush_locked()
+        if self._pending:
+            os.fsync(self._handle.fileno())
+            if self._index_handle is not None:
+                os.fsync(self._index_handle.fileno())
+        self._pending = 0
+
+    def _sync_loop(self) -> None:
+        while not self._closed.wait(self._fsync_interval):
+            with self._lock:
+                if self._pending and not self._handle.closed:
+                    self._sync_locked()
+
+
+_writers: dict[Path, JsonlWriter] = {}
+_writers_lock = threading.Lock()
+
+
+def get_writer(
+    path: Path,
+    mode: str = MODE_BATCH,
+    fsync_every: int = 100,
+    fsync_interval: float = 1.0,
+    index: bool = False,
+) -> JsonlWriter:
+    """Process-wide writer for ``path``; the first caller's policy wins."""
+    key = Path(path).resolve()
+    with _writers_lock:
+        writer = _writers.get(key)
+        if writer is None:
+            writer = JsonlWriter(key, mode, fsync_every, fsync_interval, index)
+            _writers[key] = writer
+        return writer
+
+
+def close_writer(path: Path) -> None:
+    with _writers_lock:
+        writer = _writers.pop(Path(path).resolve(), None)
+    if writer is not None:
+        writer.close()
+
+
+def close_all() -> None:
+    with _writers_lock:
+        writers = list(_writers.values())
+        _writers.clear()
+    for writer in writers:
+        writer.close()
+
+
+def exit_on_sigterm() -> None:
+    """Turn SIGTERM (docker stop, run_all restarts) into a normal exit so pending records get fsynced."""
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(128 + signum))
+
+
+atexit.register(close_all)
@@ -4,6 +4,10 @@ from dataclasses import dataclass
 from pathlib import Path
 import os
 
+from jsonl_writer import MODES
+from segment_store import COMPRESSIONS
+from sqlite_store import ENGINES
+
 
 def _env_int(name: str, default: int) -> int:
     value = os.getenv(name)
@@ -46,6 +50,11 @@ class Config:
     log_dir: Path
     data_file: Path
     index_file: Path
+    validators_file: Path
+    state_file: Path
+    outbox_dir: Path
+    segments_dir: Path
+    sqlite_file: Path
     log_file: Path
     base_url: str
     section_url: str
@@ -54,15 +63,30 @@ class Config:
     days_back: int
     max_pages: int
     timeout_seconds: int
+    connect_timeout_seconds: float
+    read_timeout_seconds: float
+    pool_connections: int
+    pool_maxsize: int
     retry_count: int
     backoff_seconds: float
-    rate_delay_min: float
-    rate_delay_max: float
+    requests_per_second: float
+    rate_burst: int
+    workers: int
     user_agent: str
     accept_language: str
     referer: str
     log_level: str
     disable_dedup: bool
+    outbox_enabled: bool
+    fsync_mode: str
+    fsync_every: int
+    fsync_interval_seconds: float
+    offset_index: bool
+    segmented_storage: bool
+    segment_max_bytes: int
+    segment_compression: str
+    retention_days: int
+    storage_engine: str
 
 
 DEFAULT_USER_AGENT = (
@@ -80,6 +104,11 @@ def get_config(overrides: dict | None = None) -> Config:
 
     data_file = data_dir / "lenta_world_politic.jsonl"
     index_file = data_dir / "lenta_world_politic_headers.txt"
+    validators_file = data_dir / "lenta_world_politic_validators.json"
+    state_file = data_dir / "lenta_world_politic_state.sqlite3"
+    outbox_dir = data_dir / "outbox"
+    segments_dir = data_dir / "lenta_world_politic"
+    sqlite_file = data_dir / "lenta_world_politic.sqlite3"
     log_file = log_dir / "lenta_parser.log"
 
     base_url = _env_str("LENTA_BASE_URL", "https://lenta.ru")
@@ -93,23 +122,51 @@ def get_config(overrides: dict | None = None) -> Config:
     max_pages = _env_int("LENTA_MAX_PAGES", 10)
 
     timeout_seconds = _env_int("LENTA_TIMEOUT_SECONDS", 15)
+    connect_timeout_seconds = _env_float("LENTA_CONNECT_TIMEOUT_SECONDS", 5.0)
+    read_timeout_seconds = _env_float("LENTA_READ_TIMEOUT_SECONDS", float(timeout_seconds))
+    pool_connections = _env_int("LENTA_POOL_CONNECTIONS", 4)
+    pool_maxsize = _env_int("LENTA_POOL_MAXSIZE", 10)
     retry_count = _env_int("LENTA_RETRY_COUNT", 3)
     backoff_seconds = _env_float("LENTA_BACKOFF_SECONDS", 1.0)
 
-    rate_delay_min = _env_float("LENTA_RATE_DELAY_MIN", 0.5)
-    rate_delay_max = _env_float("LENTA_RATE_DELAY_MAX", 1.5)
+    requests_per_second = _env_float("LENTA_REQUESTS_PER_SECOND", 2.0)
+    rate_burst = _env_int("LENTA_RATE_BURST", 2)
+    workers = _env_int("LENTA_WORKERS", 4)
 
     user_agent = _env_str("LENTA_USER_AGENT", DEFAULT_USER_AGENT)
     accept_language = _env_str("LENTA_ACCEPT_LANGUAGE", "ru-RU,ru;q=0.9")
     referer = _env_str("LENTA_REFERER", "https://lenta.ru/rubrics/world/politic/")
     log_level = _env_str("LENTA_LOG_LEVEL", "INFO")
     disable_dedup = _env_str("LENTA_DISABLE_DEDUP", "1") == "1"
+    outbox_enabled = _env_str("LENTA_OUTBOX_ENABLED", "1") == "1"
+    fsync_mode = _env_str("LENTA_FSYNC_MODE", "batch").lower()
+    if fsync_mode not in MODES:
+        raise ValueError(f"LENTA_FSYNC_MODE must be one of {', '.join(MODES)}, got {fsync_mode!r}")
+    fsync_every = _env_int("LENTA_FSYNC_EVERY", 100)
+    fsync_interval_seconds = _env_float("LENTA_FSYNC_INTERVAL_SECONDS", 1.0)
+    offset_index = _env_str("LENTA_OFFSET_INDEX", "1") == "1"
+    segmented_storage = _env_str("LENTA_SEGMENTED_STORAGE", "0") == "1"
+    segment_max_bytes = _env_int("LENTA_SEGMENT_MAX_MB", 64) * 1024 * 1024
+    segment_compression = _env_str("LENTA_SEGMENT_COMPRESSION", "gzip").lower()
+    if segment_compression not in COMPRESSIONS:
+        raise ValueError(
+            f"LENTA_SEGMENT_COMPRESSION must be one of {', '.join(COMPRESSIONS)}, got {segment_compression!r}"
+        )
+    retention_days = _env_int("LENTA_RETENTION_DAYS", 0)
+    storage_engine = _env_str("LENTA_STORAGE_ENGINE", "jsonl").lower()
+    if storage_engine not in ENGINES:
+        raise ValueError(f"LENTA_STORAGE_ENGINE must be one of {', '.join(ENGINES)}, got {storage_engine!r}")
 
     if overrides:
         if "data_dir" in overrides and overrides["data_dir"] is not None:
             data_dir = Path(overrides["data_dir"])
             data_file = data_dir / "lenta_world_politic.jsonl"
             index_file = data_dir / "lenta_world_politic_headers.txt"
+            outbox_dir = data_dir / "outbox"
+            segments_dir = data_dir / "lenta_world_politic"
+            sqlite_file = data_dir / "lenta_world_politic.sqlite3"
+            validators_file = data_dir / "lenta_world_politic_validators.json"
+            state_file = data_dir / "lenta_world_politic_state.sqlite3"
         if "log_dir" in overrides and overrides["log_dir"] is not None:
             log_dir = Path(overrides["log_dir"])
             log_file = log_dir / "lenta_parser.log"
@@ -125,6 +182,11 @@ def get_config(overrides: dict | None = None) -> Config:
         log_dir=log_dir,
         data_file=data_file,
         index_file=index_file,
+        validators_file=validators_file,
+        state_file=state_file,
+        outbox_dir=outbox_dir,
+        segments_dir=segments_dir,
+        sqlite_file=sqlite_file,
         log_file=log_file,
         base_url=base_url,
         section_url=section_url,
@@ -133,13 +195,28 @@ def get_config(overrides: dict | None = None) -> Config:
         days_back=days_back,
         max_pages=max_pages,
         timeout_seconds=timeout_seconds,
+        connect_timeout_seconds=connect_timeout_seconds,
+        read_timeout_seconds=read_timeout_seconds,
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
         retry_count=retry_count,
         backoff_seconds=backoff_seconds,
-        rate_delay_min=rate_delay_min,
-        rate_delay_max=rate_delay_max,
+        requests_per_second=requests_per_second,
+        rate_burst=rate_burst,
+        workers=workers,
         user_agent=user_agent,
         accept_language=accept_language,
         referer=referer,
         log_level=log_level,
         disable_dedup=disable_dedup,
+        outbox_enabled=outbox_enabled,
+        fsync_mode=fsync_mode,
+        fsync_every=fsync_every,
+        fsync_interval_seconds=fsync_interval_seconds,
+        offset_index=offset_index,
+        segmented_storage=segmented_storage,
+        segment_max_bytes=segment_max_bytes,
+        segment_compression=segment_compression,
+        retention_days=retention_days,
+        storage_engine=storage_engine,
     )
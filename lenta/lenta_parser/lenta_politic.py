@@ -2,23 +2,103 @@ from __future__ import annotations
 
 import json
 import re
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Iterable
+from html.parser import HTMLParser
+from typing import Callable, Iterable
 from urllib.parse import urljoin, urlparse
 
 from bs4 import BeautifulSoup
 
 from .config import Config
-from .utils import parse_datetime, request_with_retries, split_keywords, sanitize_tag
+from .storage import ValidatorCache
+from .utils import (
+    parse_datetime,
+    request_if_modified,
+    request_with_retries,
+    split_keywords,
+    sanitize_tag,
+)
 
 
 _NEWS_PATH_RE = re.compile(r"^/news/\d{4}/\d{2}/\d{2}/.+/?$")
 _URL_DATE_RE = re.compile(r"/news/(\d{4})/(\d{2})/(\d{2})/")
 
 
-def fetch_section_html(config: Config, url: str | None = None) -> str:
+def fetch_section_html(
+    config: Config,
+    url: str | None = None,
+    cache: ValidatorCache | None = None,
+) -> str | None:
     target = url or config.section_url
-    return request_with_retries(target, config)
+    if cache is None:
+        return request_with_retries(target, config)
+
+    html, validators = request_if_modified(target, config, cache.get(target))
+    if html is None:
+        cache.record_hit()
+    else:
+        cache.record_miss(target, validators)
+    return html
+
+
+def section_page_url(config: Config, page: int) -> str:
+    if page <= 1:
+        return config.section_url
+    return urljoin(config.section_url.rstrip("/") + "/", f"{page}/")
+
+
+def _fetch_page_urls(config: Config, page: int) -> list[str] | None:
+    try:
+        html = fetch_section_html(config, section_page_url(config, page))
+    except Exception:  # noqa: BLE001
+        return None
+    return extract_news_urls(html, config)
+
+
+def discover_news_urls(
+    config: Config,
+    is_fresh: Callable[[str], bool],
+    cache: ValidatorCache | None = None,
+) -> list[str] | None:
+    """Collect article urls from up to ``max_pages`` rubric pages.
+
+    Returns None when the first page is unchanged (HTTP 304). Paging stops at
+    the first page without fresh urls; pages are numbered, so they are fetched
+    ``workers`` at a time.
+
+    Skipping the deeper pages on a 304 is safe: new articles only appear on
+    the first page, and its validators are committed only after an iteration
+    that fetched every page it needed and processed every url found. If a
+    page fails here, the staged validators are discarded for that reason.
+    """
+    html = fetch_section_html(config, cache=cache)
+    if html is None:
+        return None
+
+    urls = extract_news_urls(html, config)
+    known = set(urls)
+    if not any(is_fresh(url) for url in urls):
+        return urls
+
+    page = 2
+    batch_size = max(config.workers, 1)
+    with ThreadPoolExecutor(max_workers=batch_size) as executor:
+        while page <= config.max_pages:
+            batch = range(page, min(page + batch_size, config.max_pages + 1))
+            for page_urls in executor.map(lambda number: _fetch_page_urls(config, number), batch):
+                if page_urls is None:
+                    if cache is not None:
+                        cache.discard(config.section_url)
+                    return urls
+                new_urls = [url for url in page_urls if url not in known]
+                known.update(new_urls)
+                urls.extend(new_urls)
+                if not any(is_fresh(url) for url in new_urls):
+                    return urls
+            page += len(batch)
+
+    return urls
 
 
 def _normalize_news_url(href: str | None, config: Config) -> str | None:
@@ -42,13 +122,29 @@ def _normalize_news_url(href: str | None, config: Config) -> str | None:
     return urljoin(config.base_url, href)
 
 
-def extract_news_urls(html: str, config: Config) -> list[str]:
-    soup = BeautifulSoup(html, "html.parser")
+class _LinkCollector(HTMLParser):
+    """Collects ``<a href>`` values in document order without building a tree."""
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.hrefs: list[str] = []
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        if tag != "a":
+            return
+        href = None
+        for name, value in attrs:
+            if name == "href":
+                href = value
+        if href:
+            self.hrefs.append(href)
+
+
+def _unique_news_urls(hrefs: Iterable[str | None], config: Config) -> list[str]:
     seen = set()
     urls: list[str] = []
 
-    for link in soup.find_all("a", href=True):
-        href = link.get("href")
+    for href in hrefs:
         url = _normalize_news_url(href, config)
         if not url:
             continue
@@ -60,6 +156,13 @@ def extract_news_urls(html: str, config: Config) -> list[str]:
     return urls
 
 
+def extract_news_urls(html: str, config: Config) -> list[str]:
+    collector = _LinkCollector()
+    collector.feed(html)
+    collector.close()
+    return _unique_news_urls(collector.hrefs, config)
+
+
 def extract_url_date(url: str) -> datetime | None:
     path = urlparse(url).path
     match = _URL_DATE_RE.search(path)
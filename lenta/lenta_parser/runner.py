@@ -2,32 +2,52 @@ from __future__ import annotations
 
 import argparse
 import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timedelta
+from typing import Iterator
 
-from news_api import push_news, should_pause
+from jsonl_writer import exit_on_sigterm
+from news_api import NewsBatcher, log_timing_summary, should_pause
+from news_dedup import check_duplicate, log_pair_stats
+from news_outbox import open_outbox
 from .config import get_config
-from .lenta_politic import extract_news_urls, extract_url_date, fetch_section_html, parse_news
+from .lenta_politic import discover_news_urls, extract_url_date, parse_news
 from . import storage
-from .utils import rate_limit_sleep, setup_logger
+from .utils import log_http_stats, setup_logger
 
 
 def _run_iteration(config) -> bool:
     logger = setup_logger(config)
     logger.info("Iteration start")
 
-    urls = _collect_section_urls(config)
+    seen = storage.load_seen_index(config)
+    validators = storage.load_validator_cache(config)
+    cutoff = datetime.now() - timedelta(days=config.days_back)
+    urls = _collect_section_urls(config, validators, seen, cutoff)
+    if urls is None:
+        logger.info(
+            "Section not modified, skipping iteration (cache hits=%s misses=%s)",
+            validators.hits,
+            validators.misses,
+        )
+        validators.commit()
+        return False
     urls.sort(key=lambda item: extract_url_date(item) or datetime.min, reverse=True)
-    logger.info("Found %s links", len(urls))
+    new_urls = [url for url in urls if not seen.has_url(url)]
+    logger.info("Found %s links, %s already processed", len(urls), len(urls) - len(new_urls))
 
-    cutoff = datetime.now() - timedelta(days=config.days_back)
     saved_count = 0
-
-    for url in urls:
-        rate_limit_sleep(config)
-        try:
-            record = parse_news(url, config)
-        except Exception as exc:  # noqa: BLE001
+    batcher = _news_sink(config, logger)
+    # Items handed to a direct batcher, by id, until their push result is known.
+    queued: dict[int, tuple[str, str]] = {}
+    # Urls to try again next iteration; while any are left the section validators are not kept.
+    unfinished: list[str] = []
+
+    for url, record, exc in _iter_parsed(new_urls, config):
+        if exc is not None:
             logger.error("Failed to parse %s: %s", url, exc)
+            unfinished.append(url)
             continue
 
         if not record:
@@ -44,6 +64,12 @@ def _run_iteration(config) -> bool:
             logger.info("Stop iteration: older than %s", cutoff.isoformat())
             break
 
+        fingerprint = storage.content_fingerprint(record["header"], record["text"])
+        if not config.disable_dedup and seen.is_duplicate(record["header"], fingerprint):
+            logger.info("Skip duplicate content for %s", url)
+            seen.add(url, record["header"], fingerprint)
+            continue
+
         item = {
             "header": record["header"],
             "text": record["text"],
@@ -52,26 +78,101 @@ def _run_iteration(config) -> bool:
             "image_urls": record.get("image_urls", []),
             "source_name": record["source_name"],
         }
-        result = push_news(item, logger)
-        storage.append_news(
-            {
-                "header": item["header"],
-                "text": item["text"],
-                "date": item["date"],
-                "hashtags": item["hashtags"],
-                "image_urls": item["image_urls"],
-                "source_name": item["source_name"],
-            },
-            config,
-        )
-        if should_pause(result):
+        if not seen.is_archived(url):
+            storage.append_news(
+                {
+                    "header": item["header"],
+                    "text": item["text"],
+                    "date": item["date"],
+                    "hashtags": item["hashtags"],
+                    "image_urls": item["image_urls"],
+                    "source_name": item["source_name"],
+                },
+                config,
+            )
+            seen.mark_archived(url)
+            saved_count += 1
+        duplicate_of = check_duplicate(item, logger)
+        if duplicate_of is not None:
+            logger.info("Near-duplicate of %s, not pushing: %s", duplicate_of, url)
+            seen.add(url, item["header"], fingerprint)
+            continue
+        if config.outbox_enabled:
+            # Durably queued; the outbox keeps retrying until the backend takes it.
+            seen.add(url, item["header"], fingerprint)
+        else:
+            queued[id(item)] = (url, fingerprint)
+        if _mark_pushed(seen, queued, batcher.add(item), unfinished):
             logger.info("Pause requested by backend response (ignored)")
-        saved_count += 1
 
-    logger.info("Iteration finished: saved %s", saved_count)
+    if _mark_pushed(seen, queued, batcher.flush(), unfinished):
+        logger.info("Pause requested by backend response (ignored)")
+
+    if unfinished:
+        logger.warning("%s articles were not processed, the section will be downloaded again", len(unfinished))
+        validators.discard(config.section_url)
+    validators.commit()
+    logger.info(
+        "Iteration finished: saved %s (cache hits=%s misses=%s)",
+        saved_count,
+        validators.hits,
+        validators.misses,
+    )
+    log_http_stats(logger)
+    log_timing_summary(logger)
+    log_pair_stats(logger, config.source_name)
     return False
 
 
+def _mark_pushed(seen, queued: dict[int, tuple[str, str]], results: list, unfinished: list[str]) -> bool:
+    """Mark urls of successfully pushed items as processed; True if the backend asked to pause.
+
+    A failed push leaves the url unmarked and adds it to ``unfinished``, so
+    the article is tried again on the next iteration.
+    """
+    for item, result in results:
+        url, fingerprint = queued.pop(id(item))
+        if result is not None:
+            seen.add(url, item["header"], fingerprint)
+        else:
+            unfinished.append(url)
+    return any(should_pause(result) for _, result in results)
+
+
+def _news_sink(config, logger):
+    """Outbox when enabled (results arrive asynchronously), otherwise a direct batcher."""
+    if config.outbox_enabled:
+        return open_outbox(config.outbox_dir, logger)
+    return NewsBatcher(logger)
+
+
+def _iter_parsed(urls: list[str], config) -> Iterator[tuple[str, dict | None, Exception | None]]:
+    """Parse urls on a worker pool and yield results in input order.
+
+    At most ``config.workers`` articles are in flight, so stopping early wastes
+    no more than that many downloads; not yet started ones are cancelled.
+    """
+    executor = ThreadPoolExecutor(max_workers=max(config.workers, 1))
+    pending: deque[tuple[str, Future]] = deque()
+    remaining = iter(urls)
+    try:
+        for url in remaining:
+            pending.append((url, executor.submit(parse_news, url, config)))
+            if len(pending) >= config.workers:
+                break
+        while pending:
+            url, future = pending.popleft()
+            next_url = next(remaining, None)
+            if next_url is not None:
+                pending.append((next_url, executor.submit(parse_news, next_url, config)))
+            try:
+                yield url, future.result(), None
+            except Exception as exc:  # noqa: BLE001
+                yield url, None, exc
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
 def run_forever(config) -> None:
     logger = setup_logger(config)
     logger.info("Run forever with interval %s minutes", config.interval_minutes)
@@ -88,9 +189,17 @@ def run_forever(config) -> None:
             time.sleep(config.interval_minutes * 60)
 
 
-def _collect_section_urls(config) -> list[str]:
-    html = fetch_section_html(config)
-    return extract_news_urls(html, config)
+def _collect_section_urls(config, validators=None, seen=None, cutoff=None) -> list[str] | None:
+    def is_fresh(url: str) -> bool:
+        if seen is not None and seen.has_url(url):
+            return False
+        url_date = extract_url_date(url)
+        # Url dates are whole days, so only a day entirely before the cutoff is stale.
+        if cutoff is not None and url_date is not None and url_date + timedelta(days=1) < cutoff:
+            return False
+        return True
+
+    return discover_news_urls(config, is_fresh, cache=validators)
 
 
 def _parse_args() -> argparse.Namespace:
@@ -121,6 +230,7 @@ def main() -> None:
         "log_level": args.log_level,
     }
     config = get_config(overrides)
+    exit_on_sigterm()
     run_forever(config)
 
 
@@ -1,16 +1,21 @@
 from __future__ import annotations
 
+import hashlib
 import json
 import os
 import re
-from pathlib import Path
+from datetime import datetime, timedelta
 
+from jsonl_writer import get_writer
+from segment_store import open_store
+from sqlite_store import ENGINE_SQLITE, open_database
+from state_store import open_state
 from .config import Config
-from .utils import utc_now_iso
 
 
 _INVISIBLE_RE = re.compile(r"[\u200b\u200c\u200d\uFEFF]")
 _WHITESPACE_RE = re.compile(r"\s+")
+_INDEX_SEPARATOR = "\t"
 
 
 def normalize_header(header: str) -> str:
@@ -24,42 +29,185 @@ def _ensure_dirs(config: Config) -> None:
     config.data_dir.mkdir(parents=True, exist_ok=True)
 
 
-def load_header_index(config: Config) -> set[str]:
+def content_fingerprint(header: str, text: str) -> str:
+    normalized_text = _WHITESPACE_RE.sub(" ", _INVISIBLE_RE.sub("", text)).strip()
+    payload = f"{normalize_header(header)}\n{normalized_text}"
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def _parse_index_line(line: str) -> tuple[datetime | None, str, str, str] | None:
+    value = line.rstrip("\n")
+    if not value.strip():
+        return None
+    parts = value.split(_INDEX_SEPARATOR)
+    if len(parts) != 4:
+        # Legacy line: a bare normalized header without url or timestamp.
+        return None, "", "", value.strip()
+    recorded_at, url, fingerprint, header = parts
+    try:
+        parsed = datetime.fromisoformat(recorded_at)
+    except ValueError:
+        parsed = None
+    return parsed, url, fingerprint, header
+
+
+class SeenIndex:
+    """Processed article urls, content fingerprints and headers, kept for ``days_back``.
+
+    Keys live in the parser's state store under the source name, so nothing
+    is loaded into memory at startup.
+    """
+
+    def __init__(self, config: Config) -> None:
+        self._config = config
+        self._namespace = config.source_name
+        self._ttl_seconds = timedelta(days=config.days_back + 1).total_seconds()
+        self._state = open_state(config.state_file)
+
+    def has_url(self, url: str) -> bool:
+        return self._state.is_seen(self._namespace, f"url:{url}")
+
+    def is_duplicate(self, header: str, fingerprint: str) -> bool:
+        return self._state.is_seen(self._namespace, f"fp:{fingerprint}") or self._state.is_seen(
+            self._namespace, f"header:{normalize_header(header)}"
+        )
+
+    def add(self, url: str, header: str, fingerprint: str) -> None:
+        self._state.mark_seen(self._namespace, _seen_keys(url, fingerprint, normalize_header(header)), self._ttl_seconds)
+
+    def is_archived(self, url: str) -> bool:
+        return self._state.is_seen(self._namespace, f"archived:{url}")
+
+    def mark_archived(self, url: str) -> None:
+        """Remember that ``url`` is in the archive, so a retried push does not store it again."""
+        self._state.mark_seen(self._namespace, [f"archived:{url}"], self._ttl_seconds)
+
+    def import_legacy_index(self) -> None:
+        """Move entries of the old ``*_headers.txt`` index into the state store once."""
+        if self._state.get_cursor(self._namespace, "legacy_index_imported"):
+            return
+        keys: list[str] = []
+        if self._config.index_file.exists():
+            cutoff = datetime.now() - timedelta(seconds=self._ttl_seconds)
+            with self._config.index_file.open("r", encoding="utf-8") as handle:
+                for line in handle:
+                    parsed = _parse_index_line(line)
+                    if parsed is None or (parsed[0] is not None and parsed[0] < cutoff):
+                        continue
+                    keys.extend(_seen_keys(*parsed[1:]))
+        self._state.checkpoint(
+            self._namespace,
+            cursors={"legacy_index_imported": True},
+            seen=keys,
+            ttl_seconds=self._ttl_seconds,
+        )
+
+
+def _seen_keys(url: str, fingerprint: str, header: str) -> list[str]:
+    keys = []
+    if url:
+        keys.append(f"url:{url}")
+    if fingerprint:
+        keys.append(f"fp:{fingerprint}")
+    if header:
+        keys.append(f"header:{header}")
+    return keys
+
+
+def load_seen_index(config: Config) -> SeenIndex:
     _ensure_dirs(config)
-    if not config.index_file.exists():
-        return set()
-
-    headers: set[str] = set()
-    with config.index_file.open("r", encoding="utf-8") as handle:
-        for line in handle:
-            value = line.strip()
-            if value:
-                headers.add(value)
-    return headers
-
-
-def append_news(record: dict, config: Config) -> None:
+    index = SeenIndex(config)
+    index.import_legacy_index()
+    return index
+
+
+class ValidatorCache:
+    """ETag/Last-Modified validators of section pages plus hit/miss counters."""
+
+    def __init__(self, config: Config) -> None:
+        self._config = config
+        self._validators: dict[str, dict[str, str]] = {}
+        self._pending: dict[str, dict[str, str]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, url: str) -> dict[str, str]:
+        return dict(self._validators.get(url, {}))
+
+    def record_hit(self) -> None:
+        self.hits += 1
+
+    def record_miss(self, url: str, validators: dict[str, str]) -> None:
+        self.misses += 1
+        self._pending[url] = validators
+
+    def discard(self, url: str) -> None:
+        """Drop staged validators, so the next request for ``url`` still gets the full page."""
+        self._pending.pop(url, None)
+
+    def load(self) -> None:
+        if not self._config.validators_file.exists():
+            return
+        try:
+            with self._config.validators_file.open("r", encoding="utf-8") as handle:
+                data = json.load(handle)
+        except (OSError, json.JSONDecodeError):
+            return
+        self._validators = data.get("validators", {})
+        self.hits = int(data.get("hits", 0))
+        self.misses = int(data.get("misses", 0))
+
+    def commit(self) -> None:
+        """Persist validators once the pages they describe were fully processed."""
+        self._validators.update(self._pending)
+        self._pending = {}
+        data = {
+            "source_name": self._config.source_name,
+            "hits": self.hits,
+            "misses": self.misses,
+            "validators": self._validators,
+        }
+        tmp_path = self._config.validators_file.with_suffix(".tmp")
+        with tmp_path.open("w", encoding="utf-8") as handle:
+            json.dump(data, handle, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self._config.validators_file)
+
+
+def load_validator_cache(config: Config) -> ValidatorCache:
     _ensure_dirs(config)
-    with config.data_file.open("a", encoding="utf-8") as handle:
-        handle.write(json.dumps(record, ensure_ascii=False))
-        handle.write("\n")
-        handle.flush()
-        os.fsync(handle.fileno())
+    cache = ValidatorCache(config)
+    cache.load()
+    return cache
 
 
-def write_event(status: str, item: dict, config: Config, error_message: str | None = None) -> None:
-    event = {
-        "recorded_at": utc_now_iso(),
-        "status": status,
-        "item": item,
-    }
-    if error_message:
-        event["error_message"] = error_message
-    append_news(event, config)
-
-
-def append_header(normalized_header: str, config: Config) -> None:
+def append_news(record: dict, config: Config) -> None:
     _ensure_dirs(config)
-    with config.index_file.open("a", encoding="utf-8") as handle:
-        handle.write(normalized_header)
-        handle.write("\n")
+    if config.storage_engine == ENGINE_SQLITE:
+        database = open_database(
+            config.sqlite_file,
+            batch_size=config.fsync_every,
+            flush_interval=config.fsync_interval_seconds,
+        )
+        database.write(record)
+        return
+    if config.segmented_storage:
+        store = open_store(
+            config.segments_dir,
+            config.data_file.stem,
+            max_bytes=config.segment_max_bytes,
+            compression=config.segment_compression,
+            retention_days=config.retention_days,
+            fsync_mode=config.fsync_mode,
+            fsync_every=config.fsync_every,
+            fsync_interval=config.fsync_interval_seconds,
+        )
+        store.write(record)
+        return
+    writer = get_writer(
+        config.data_file,
+        mode=config.fsync_mode,
+        fsync_every=config.fsync_every,
+        fsync_interval=config.fsync_interval_seconds,
+        index=config.offset_index,
+    )
+    writer.write(record)
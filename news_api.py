@@ -1,57 +1,462 @@
 from __future__ import annotations
 
+import http.client
 import json
 import logging
 import os
+import queue
+import select
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
 from typing import Any
-from urllib import error as url_error
-from urllib import request as url_request
+from urllib.parse import urljoin, urlsplit
 
 
 DEFAULT_API_URL = "http://localhost:8080/test/save_news"
 API_URL = os.getenv("NEWS_API_URL", DEFAULT_API_URL)
 TIMEOUT_SECONDS = int(os.getenv("NEWS_API_TIMEOUT", "10"))
+BATCH_API_URL = os.getenv("NEWS_API_BATCH_URL") or f"{API_URL.rstrip('/')}_batch"
+BATCH_SIZE = int(os.getenv("NEWS_API_BATCH_SIZE", "20"))
+BATCH_LINGER_SECONDS = float(os.getenv("NEWS_API_BATCH_LINGER_SECONDS", "2"))
+POOL_SIZE = int(os.getenv("NEWS_API_POOL_SIZE", "4"))
+MAX_REDIRECTS = 5
+BATCH_REPROBE_SECONDS = 600
 
+# Set when the backend answers the batch route with 404/405; single pushes
+# are used until then, after which the batch route is tried again.
+_batch_unavailable_until = 0.0
 
-def push_news(item: dict, logger: logging.Logger | None = None) -> dict[str, Any] | None:
-    payload = {
+
+# Errors while sending that mean a kept-alive socket was closed by the server while idle.
+_STALE_ERRORS = (
+    http.client.CannotSendRequest,
+    BrokenPipeError,
+    ConnectionResetError,
+    ConnectionAbortedError,
+)
+
+
+class _RouteMissing(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class PushFailure:
+    """Why an item was not accepted: the HTTP status (None if no answer came) and whether a retry can help.
+
+    Only 4xx answers other than 408/429 are permanent; transport errors, 5xx
+    and malformed responses are worth retrying.
+    """
+
+    status: int | None = None
+    permanent: bool = False
+
+    @classmethod
+    def from_status(cls, status: int) -> "PushFailure":
+        return cls(status, 400 <= status < 500 and status not in (408, 429))
+
+
+@dataclass(frozen=True)
+class CallTiming:
+    """Latency of one backend call: TCP/TLS connect, server time to headers, and total."""
+
+    url: str
+    status: int
+    reused: bool
+    connect_ms: float
+    server_ms: float
+    total_ms: float
+
+
+# Calls since the last ``take_timings()``; bounded so a process that never
+# logs a summary does not grow without limit.
+_timings: deque[CallTiming] = deque(maxlen=10000)
+_timings_lock = threading.Lock()
+
+
+@dataclass
+class RequestOptions:
+    """Per-caller settings for backend requests.
+
+    ``pool_size`` is the number of kept-alive connections to the backend
+    host (default ``POOL_SIZE``), ``limiter`` an object whose ``acquire()``
+    is called before every HTTP request, and ``timings`` a list that
+    receives the ``CallTiming`` of every answered request. ``attempts``
+    counts the HTTP requests started, answered or not.
+    """
+
+    pool_size: int | None = None
+    limiter: Any = None
+    timings: list[CallTiming] | None = None
+    attempts: int = 0
+
+
+class _ConnectionPool:
+    """Thread-safe pool of keep-alive connections to one scheme/host/port."""
+
+    def __init__(self, scheme: str, host: str, port: int | None, maxsize: int) -> None:
+        self._scheme = scheme
+        self._host = host
+        self._port = port
+        self._idle: queue.LifoQueue[http.client.HTTPConnection] = queue.LifoQueue(maxsize=max(maxsize, 1))
+
+    def ensure_size(self, maxsize: int) -> None:
+        """Keep up to ``maxsize`` idle connections from now on (the pool never shrinks)."""
+        with self._idle.mutex:
+            self._idle.maxsize = max(self._idle.maxsize, maxsize)
+
+    def _new_connection(self) -> http.client.HTTPConnection:
+        if self._scheme == "https":
+            return http.client.HTTPSConnection(self._host, self._port, timeout=TIMEOUT_SECONDS)
+        return http.client.HTTPConnection(self._host, self._port, timeout=TIMEOUT_SECONDS)
+
+    def _release(self, conn: http.client.HTTPConnection) -> None:
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def _acquire(self) -> tuple[http.client.HTTPConnection, bool]:
+        """An idle connection the server has not closed meanwhile, else a new one."""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                return self._new_connection(), False
+            # An idle keep-alive socket is readable only if the server closed it.
+            if conn.sock is not None and not select.select([conn.sock], [], [], 0)[0]:
+                return conn, True
+            conn.close()
+
+    def request(
+        self, method: str, url: str, body: bytes, headers: dict[str, str]
+    ) -> tuple[int, http.client.HTTPMessage, bytes, CallTiming]:
+        target = urlsplit(url)
+        path = target.path or "/"
+        if target.query:
+            path = f"{path}?{target.query}"
+
+        conn, reused = self._acquire()
+        while True:
+            started = time.perf_counter()
+            connect_ms = 0.0
+            try:
+                if conn.sock is None:
+                    conn.connect()
+                    connect_ms = (time.perf_counter() - started) * 1000
+                conn.request(method, path, body=body, headers=headers)
+            except _STALE_ERRORS:
+                conn.close()
+                if not reused:
+                    raise
+                # The request never reached the server, so sending it again
+                # on a fresh connection cannot duplicate it.
+                conn, reused = self._new_connection(), False
+                continue
+            except Exception:
+                conn.close()
+                raise
+            break
+
+        # Once sent, a failure is not retried here: the server may have acted on it.
+        try:
+            sent = time.perf_counter()
+            resp = conn.getresponse()
+            server_ms = (time.perf_counter() - sent) * 1000
+            data = resp.read()
+        except Exception:
+            conn.close()
+            raise
+
+        total_ms = (time.perf_counter() - started) * 1000
+        if resp.will_close:
+            conn.close()
+        else:
+            self._release(conn)
+
+        timing = CallTiming(url, resp.status, reused, connect_ms, server_ms, total_ms)
+        with _timings_lock:
+            _timings.append(timing)
+        return resp.status, resp.headers, data, timing
+
+
+_pools: dict[tuple[str, str, int | None], _ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def _get_pool(url: str, size: int | None = None) -> _ConnectionPool:
+    target = urlsplit(url)
+    key = (target.scheme, target.hostname or "", target.port)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _ConnectionPool(target.scheme, key[1], key[2], size or POOL_SIZE)
+            _pools[key] = pool
+        elif size:
+            pool.ensure_size(size)
+        return pool
+
+
+def take_timings() -> list[CallTiming]:
+    """Timings of the backend calls since the previous call, oldest first."""
+    with _timings_lock:
+        timings = list(_timings)
+        _timings.clear()
+    return timings
+
+
+def _percentile(values: list[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(int(round(fraction * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def timing_summary(timings: list[CallTiming]) -> dict[str, float]:
+    connect = [timing.connect_ms for timing in timings if not timing.reused]
+    server = [timing.server_ms for timing in timings]
+    return {
+        "calls": len(timings),
+        "reused": sum(1 for timing in timings if timing.reused),
+        "connect_p50_ms": _percentile(connect, 0.5),
+        "server_p50_ms": _percentile(server, 0.5),
+        "server_p95_ms": _percentile(server, 0.95),
+    }
+
+
+def log_timing_summary(logger: logging.Logger) -> None:
+    """Log latencies of the calls made since the previous summary, then start over."""
+    summary = timing_summary(take_timings())
+    if not summary["calls"]:
+        return
+    logger.info(
+        "News API: calls=%s reused=%s connect p50=%.1fms server p50=%.1fms p95=%.1fms",
+        summary["calls"],
+        summary["reused"],
+        summary["connect_p50_ms"],
+        summary["server_p50_ms"],
+        summary["server_p95_ms"],
+    )
+
+
+def _to_payload(item: dict) -> dict[str, Any]:
+    return {
         "title": item.get("header", ""),
         "body": item.get("text", ""),
         "source": item.get("source_name"),
         "hash_tags": item.get("hashtags") or [],
         "published_at": item.get("date"),
     }
+
+
+def _post_json(
+    url: str,
+    payload: Any,
+    logger: logging.Logger | None,
+    missing_route_ok: bool = False,
+    options: RequestOptions | None = None,
+) -> Any:
+    """Decoded JSON answer of the backend, or a ``PushFailure``."""
+    options = options or RequestOptions()
     data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
-    req = url_request.Request(
-        API_URL,
-        data=data,
-        headers={"Content-Type": "application/json"},
-        method="POST",
-    )
-    try:
-        with url_request.urlopen(req, timeout=TIMEOUT_SECONDS) as resp:
-            body = resp.read().decode("utf-8")
-    except url_error.HTTPError as exc:
-        error_body = exc.read().decode("utf-8", errors="replace")
+    headers = {"Content-Type": "application/json", "Connection": "keep-alive"}
+    for _ in range(MAX_REDIRECTS + 1):
+        if options.limiter is not None:
+            options.limiter.acquire()
+        options.attempts += 1
+        try:
+            status, response_headers, raw, timing = _get_pool(url, options.pool_size).request(
+                "POST", url, data, headers
+            )
+        except Exception as exc:  # noqa: BLE001
+            if logger:
+                logger.error("Failed to push news: %s", exc)
+            return PushFailure()
+        if options.timings is not None:
+            options.timings.append(timing)
+        location = response_headers.get("Location")
+        # Only 307/308 keep the method and body; following 301-303 would turn the POST into a GET.
+        if status not in (307, 308) or not location:
+            break
+        url = urljoin(url, location)
+    else:
         if logger:
-            logger.error("HTTP error pushing news: %s %s", exc.code, error_body)
-        return None
-    except Exception as exc:  # noqa: BLE001
+            logger.error("News API redirected more than %s times, last to %s", MAX_REDIRECTS, url)
+        return PushFailure(status)
+
+    if logger:
+        logger.debug(
+            "News API %s: status=%s reused=%s connect=%.1fms server=%.1fms total=%.1fms",
+            url,
+            status,
+            timing.reused,
+            timing.connect_ms,
+            timing.server_ms,
+            timing.total_ms,
+        )
+
+    if 300 <= status < 400:
+        if logger:
+            logger.error(
+                "News API redirected with %s to %s; only 307/308 are followed, set the final URL instead",
+                status,
+                response_headers.get("Location"),
+            )
+        return PushFailure(status)
+
+    if status >= 400:
+        if missing_route_ok and status in (404, 405):
+            raise _RouteMissing(url)
         if logger:
-            logger.error("Failed to push news: %s", exc)
-        return None
+            logger.error("HTTP error pushing news: %s %s", status, raw.decode("utf-8", errors="replace"))
+        return PushFailure.from_status(status)
 
+    body = raw.decode("utf-8")
     if not body:
         if logger:
             logger.error("Empty response from news API")
-        return None
+        return PushFailure(status)
 
     try:
         return json.loads(body)
     except json.JSONDecodeError:
         if logger:
             logger.error("Invalid JSON response from news API: %s", body)
-        return None
+        return PushFailure(status)
+
+
+def _push_one(item: dict, logger: logging.Logger | None, options: RequestOptions) -> dict[str, Any] | PushFailure:
+    result = _post_json(API_URL, _to_payload(item), logger, options=options)
+    if isinstance(result, (dict, PushFailure)):
+        return result
+    if logger:
+        logger.error("Unexpected response from news API: %s", result)
+    return PushFailure()
+
+
+def push_news(
+    item: dict,
+    logger: logging.Logger | None = None,
+    options: RequestOptions | None = None,
+) -> dict[str, Any] | None:
+    result = _push_one(item, logger, options or RequestOptions())
+    return None if isinstance(result, PushFailure) else result
+
+
+def push_news_batch_detailed(
+    items: list[dict],
+    logger: logging.Logger | None = None,
+    batch_size: int | None = None,
+    options: RequestOptions | None = None,
+) -> list[dict[str, Any] | PushFailure]:
+    """Like ``push_news_batch``, but a failed item gets a ``PushFailure`` instead of None.
+
+    A batch request the backend rejects with a permanent 4xx (one invalid
+    item fails validation for the whole request) is retried item by item,
+    so only the offending items end up rejected.
+    """
+    global _batch_unavailable_until
+    options = options or RequestOptions()
+    results: list[dict[str, Any] | PushFailure] = []
+    size = max(batch_size or BATCH_SIZE, 1)
+    for start in range(0, len(items), size):
+        chunk = items[start:start + size]
+        if time.monotonic() < _batch_unavailable_until:
+            results.extend(_push_one(item, logger, options) for item in chunk)
+            continue
+        try:
+            response = _post_json(
+                BATCH_API_URL,
+                {"items": [_to_payload(item) for item in chunk]},
+                logger,
+                missing_route_ok=True,
+                options=options,
+            )
+        except _RouteMissing:
+            _batch_unavailable_until = time.monotonic() + BATCH_REPROBE_SECONDS
+            if logger:
+                logger.warning(
+                    "Batch route %s not available, single pushes for the next %s seconds",
+                    BATCH_API_URL,
+                    BATCH_REPROBE_SECONDS,
+                )
+            results.extend(_push_one(item, logger, options) for item in chunk)
+            continue
+
+        if isinstance(response, PushFailure):
+            if response.permanent and len(chunk) > 1:
+                results.extend(_push_one(item, logger, options) for item in chunk)
+            else:
+                results.extend([response] * len(chunk))
+            continue
+        chunk_results = response.get("items") if isinstance(response, dict) else None
+        if not isinstance(chunk_results, list) or len(chunk_results) != len(chunk):
+            if logger:
+                logger.error("Unexpected batch response from news API: %s", response)
+            results.extend([PushFailure()] * len(chunk))
+            continue
+        # The backend answered for this very item, so retrying will not change its mind.
+        results.extend(
+            result if isinstance(result, dict) else PushFailure(permanent=True) for result in chunk_results
+        )
+    return results
+
+
+def push_news_batch(
+    items: list[dict],
+    logger: logging.Logger | None = None,
+    batch_size: int | None = None,
+    options: RequestOptions | None = None,
+) -> list[dict[str, Any] | None]:
+    """Push items ``batch_size`` (default ``BATCH_SIZE``) per request; results keep the order of ``items``.
+
+    Each result is the backend's ``created``/``news_id``/``cluster_id`` dict or
+    None for a failed item. Without a batch route the items go one by one.
+    """
+    return [
+        None if isinstance(result, PushFailure) else result
+        for result in push_news_batch_detailed(items, logger, batch_size, options)
+    ]
+
+
+class NewsBatcher:
+    """Collects items and pushes them once ``BATCH_SIZE`` are queued or the oldest waited ``BATCH_LINGER_SECONDS``.
+
+    There is no timer: both limits are checked in ``add``, whose caller gets
+    the results. A partial batch therefore waits for the next item or for
+    the ``flush`` the parsers call at the end of every iteration or channel.
+    """
+
+    def __init__(
+        self,
+        logger: logging.Logger | None = None,
+        batch_size: int | None = None,
+        linger_seconds: float | None = None,
+    ) -> None:
+        self._logger = logger
+        self._batch_size = max(batch_size or BATCH_SIZE, 1)
+        self._linger_seconds = BATCH_LINGER_SECONDS if linger_seconds is None else linger_seconds
+        self._items: list[dict] = []
+        self._first_added = 0.0
+
+    def add(self, item: dict) -> list[tuple[dict, dict[str, Any] | None]]:
+        """Queue an item; returns ``(item, result)`` pairs if this triggered a push."""
+        if not self._items:
+            self._first_added = time.monotonic()
+        self._items.append(item)
+        lingered = time.monotonic() - self._first_added >= self._linger_seconds
+        if len(self._items) >= self._batch_size or lingered:
+            return self.flush()
+        return []
+
+    def flush(self) -> list[tuple[dict, dict[str, Any] | None]]:
+        if not self._items:
+            return []
+        items, self._items = self._items, []
+        return list(zip(items, push_news_batch(items, self._logger)))
 
 
 def should_pause(result: dict[str, Any] | None) -> bool:
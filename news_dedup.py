@@ -0,0 +1,322 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from array import array
+from datetime import datetime, timezone
+from pathlib import Path
+
+
+ROOT_DIR = Path(__file__).resolve().parent
+
+ENABLED = os.getenv("NEWS_DEDUP_ENABLED", "1") == "1"
+DB_PATH = Path(os.getenv("NEWS_DEDUP_DB") or ROOT_DIR / "data" / "news_dedup.sqlite3")
+WINDOW_HOURS = float(os.getenv("NEWS_DEDUP_WINDOW_HOURS", "48"))
+THRESHOLD = float(os.getenv("NEWS_DEDUP_THRESHOLD", "0.7"))
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_WORDS = 3
+PRUNE_EVERY_SECONDS = 600
+
+_MERSENNE = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_WORD_RE = re.compile(r"\w+")
+
+
+def _permutations() -> list[tuple[int, int]]:
+    # Derived from fixed seeds so every process builds identical signatures.
+    params = []
+    for index in range(NUM_PERM):
+        digest = hashlib.blake2b(f"minhash-{index}".encode(), digest_size=16).digest()
+        a = int.from_bytes(digest[:8], "big") % (_MERSENNE - 1) + 1
+        b = int.from_bytes(digest[8:], "big") % _MERSENNE
+        params.append((a, b))
+    return params
+
+
+_PERMUTATIONS = _permutations()
+
+
+def shingles(header: str, text: str) -> set[bytes]:
+    words = _WORD_RE.findall(f"{header} {text}".lower())
+    if len(words) < SHINGLE_WORDS:
+        return {" ".join(words).encode("utf-8")} if words else set()
+    return {
+        " ".join(words[index:index + SHINGLE_WORDS]).encode("utf-8")
+        for index in range(len(words) - SHINGLE_WORDS + 1)
+    }
+
+
+def minhash(header: str, text: str) -> array | None:
+    """MinHash signature of the word 3-gram set, or None when there are no words."""
+    hashes = [int.from_bytes(hashlib.blake2b(item, digest_size=4).digest(), "big") for item in shingles(header, text)]
+    if not hashes:
+        return None
+    signature = array("I")
+    for a, b in _PERMUTATIONS:
+        signature.append(min(((a * value + b) % _MERSENNE) & _MAX_HASH for value in hashes))
+    return signature
+
+
+def similarity(left: array, right: array) -> float:
+    """Jaccard estimate: share of equal signature slots."""
+    return sum(1 for x, y in zip(left, right) if x == y) / len(left)
+
+
+def _band_keys(signature: array) -> list[int]:
+    keys = []
+    for band in range(BANDS):
+        chunk = signature[band * ROWS:(band + 1) * ROWS].tobytes()
+        digest = hashlib.blake2b(bytes([band]) + chunk, digest_size=8).digest()
+        keys.append(int.from_bytes(digest, "big", signed=True))
+    return keys
+
+
+def _published_ts(value) -> float:
+    if value:
+        try:
+            parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+            if parsed.tzinfo is None:
+                parsed = parsed.replace(tzinfo=timezone.utc)
+            return parsed.timestamp()
+        except ValueError:
+            pass
+    return time.time()
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS signatures (
+    id INTEGER PRIMARY KEY,
+    source TEXT NOT NULL,
+    published_ts REAL NOT NULL,
+    seen_ts REAL NOT NULL,
+    signature BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS bands (
+    key INTEGER NOT NULL,
+    signature_id INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS bands_key ON bands (key);
+CREATE INDEX IF NOT EXISTS bands_signature ON bands (signature_id);
+CREATE INDEX IF NOT EXISTS signatures_seen ON signatures (seen_ts);
+CREATE TABLE IF NOT EXISTS verdicts (
+    source TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    duplicate_of TEXT,
+    seen_ts REAL NOT NULL,
+    PRIMARY KEY (source, content_hash)
+);
+CREATE TABLE IF NOT EXISTS pair_hits (
+    source TEXT NOT NULL,
+    duplicate_of TEXT NOT NULL,
+    hits INTEGER NOT NULL,
+    PRIMARY KEY (source, duplicate_of)
+);
+CREATE TABLE IF NOT EXISTS source_checks (
+    source TEXT PRIMARY KEY,
+    checks INTEGER NOT NULL
+);
+"""
+
+
+class NearDuplicateIndex:
+    """Cross-source near-duplicate detector shared by all parsers through one SQLite file.
+
+    Items are reduced to MinHash signatures over word 3-grams of
+    header + text and banded into an LSH table, so a lookup only compares
+    against items sharing a band bucket. Only items published within
+    ``window_hours`` of each other are compared, and older entries are
+    pruned. An item is a duplicate when an earlier item from a different
+    source has an estimated Jaccard similarity of at least ``threshold``.
+    """
+
+    def __init__(self, path: Path, window_hours: float = WINDOW_HOURS, threshold: float = THRESHOLD) -> None:
+        self.path = Path(path)
+        self._window = window_hours * 3600
+        self._threshold = threshold
+        self._lock = threading.Lock()
+        self._last_prune = 0.0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def check(self, item: dict) -> str | None:
+        """Register ``item``; return the source of an earlier near-duplicate, or None.
+
+        Re-checking the same item from the same source returns the first
+        verdict without counting another hit.
+        """
+        source = item.get("source_name") or ""
+        header, text = item.get("header") or "", item.get("text") or ""
+        content_hash = hashlib.sha1(f"{header}\n{text}".encode("utf-8")).hexdigest()
+        now = time.time()
+
+        with self._lock:
+            self._maybe_prune(now)
+            cached = self._verdict(source, content_hash)
+        if cached is not None:
+            return cached[0]
+
+        # Signatures are built outside the write transaction, which other
+        # parser processes wait on.
+        signature = minhash(header, text)
+        keys = _band_keys(signature) if signature is not None else []
+        published = _published_ts(item.get("date"))
+
+        with self._lock:
+            conn = self._conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                cached = self._verdict(source, content_hash)
+                if cached is not None:
+                    conn.execute("COMMIT")
+                    return cached[0]
+
+                duplicate_of = None
+                if signature is not None:
+                    duplicate_of = self._best_match(signature, keys, source, published)
+                conn.execute(
+                    "INSERT INTO verdicts (source, content_hash, duplicate_of, seen_ts) VALUES (?, ?, ?, ?)",
+                    (source, content_hash, duplicate_of, now),
+                )
+                conn.execute(
+                    "INSERT INTO source_checks (source, checks) VALUES (?, 1) "
+                    "ON CONFLICT(source) DO UPDATE SET checks = checks + 1",
+                    (source,),
+                )
+                if duplicate_of is not None:
+                    conn.execute(
+                        "INSERT INTO pair_hits (source, duplicate_of, hits) VALUES (?, ?, 1) "
+                        "ON CONFLICT(source, duplicate_of) DO UPDATE SET hits = hits + 1",
+                        (source, duplicate_of),
+                    )
+                elif signature is not None:
+                    cursor = conn.execute(
+                        "INSERT INTO signatures (source, published_ts, seen_ts, signature) VALUES (?, ?, ?, ?)",
+                        (source, published, now, signature.tobytes()),
+                    )
+                    conn.executemany(
+                        "INSERT INTO bands (key, signature_id) VALUES (?, ?)",
+                        [(key, cursor.lastrowid) for key in keys],
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return duplicate_of
+
+    def _verdict(self, source: str, content_hash: str) -> tuple[str | None] | None:
+        return self._conn.execute(
+            "SELECT duplicate_of FROM verdicts WHERE source = ? AND content_hash = ?",
+            (source, content_hash),
+        ).fetchone()
+
+    def pair_stats(self) -> list[tuple[str, str, int, int]]:
+        """``(source, duplicate_of, hits, checks of source)`` for every pair seen so far."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT p.source, p.duplicate_of, p.hits, c.checks FROM pair_hits p "
+                "JOIN source_checks c ON c.source = p.source ORDER BY p.hits DESC"
+            ).fetchall()
+
+    def _best_match(self, signature: array, keys: list[int], source: str, published: float) -> str | None:
+        placeholders = ",".join("?" * len(keys))
+        rows = self._conn.execute(
+            f"SELECT DISTINCT s.id, s.source, s.published_ts, s.signature FROM bands b "
+            f"JOIN signatures s ON s.id = b.signature_id WHERE b.key IN ({placeholders})",
+            keys,
+        ).fetchall()
+        best_source, best_score = None, self._threshold
+        for _, candidate_source, candidate_published, blob in rows:
+            if candidate_source == source or abs(candidate_published - published) > self._window:
+                continue
+            candidate = array("I")
+            candidate.frombytes(blob)
+            score = similarity(signature, candidate)
+            if score >= best_score:
+                best_source, best_score = candidate_source, score
+        return best_source
+
+    def _maybe_prune(self, now: float) -> None:
+        if now - self._last_prune < PRUNE_EVERY_SECONDS:
+            return
+        self._last_prune = now
+        cutoff = now - self._window
+        conn = self._conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "DELETE FROM bands WHERE signature_id IN (SELECT id FROM signatures WHERE seen_ts < ?)",
+                (cutoff,),
+            )
+            conn.execute("DELETE FROM signatures WHERE seen_ts < ?", (cutoff,))
+            conn.execute("DELETE FROM verdicts WHERE seen_ts < ?", (cutoff,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+
+_index: NearDuplicateIndex | None = None
+_index_lock = threading.Lock()
+
+
+def get_index() -> NearDuplicateIndex | None:
+    """Process-wide index, or None when ``NEWS_DEDUP_ENABLED=0``."""
+    global _index
+    if not ENABLED:
+        return None
+    with _index_lock:
+        if _index is None:
+            _index = NearDuplicateIndex(DB_PATH)
+        return _index
+
+
+def check_duplicate(item: dict, logger: logging.Logger | None = None) -> str | None:
+    """Source of an earlier near-duplicate of ``item``; None if unique, disabled or on error."""
+    index = get_index()
+    if index is None:
+        return None
+    try:
+        return index.check(item)
+    except sqlite3.Error as exc:
+        if logger:
+            logger.error("Near-duplicate check failed, pushing anyway: %s", exc)
+        return None
+
+
+def log_pair_stats(logger: logging.Logger, source_prefix: str = "") -> None:
+    """Log hit rates for pairs whose checked ``source`` starts with ``source_prefix``.
+
+    Each parser passes its own source, so it reports how often its items
+    matched earlier news, whichever source ``duplicate_of`` is.
+    """
+    index = get_index()
+    if index is None:
+        return
+    try:
+        stats = index.pair_stats()
+    except sqlite3.Error as exc:
+        logger.error("Failed to read near-duplicate stats: %s", exc)
+        return
+    for source, duplicate_of, hits, checks in stats:
+        if not source.startswith(source_prefix):
+            continue
+        logger.info(
+            "Near-duplicates %s -> %s: %s of %s checked (%.1f%%)",
+            source,
+            duplicate_of,
+            hits,
+            checks,
+            100.0 * hits / max(checks, 1),
+        )
@@ -0,0 +1,320 @@
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+from pathlib import Path
+from typing import Any
+
+from news_api import BATCH_SIZE, PushFailure, push_news_batch_detailed, should_pause
+
+
+SEGMENT_BYTES = int(os.getenv("NEWS_OUTBOX_SEGMENT_BYTES", str(4 * 1024 * 1024)))
+MAX_BACKOFF_SECONDS = float(os.getenv("NEWS_OUTBOX_MAX_BACKOFF_SECONDS", "60"))
+IDLE_POLL_SECONDS = 1.0
+
+_SEGMENT_PREFIX = "outbox-"
+_SEGMENT_SUFFIX = ".jsonl"
+_CURSOR_NAME = "cursor.json"
+_DEAD_LETTER_NAME = "dead_letter.jsonl"
+_REDRIVE_NAME = "redrive.jsonl"
+
+
+def _segment_name(seq: int) -> str:
+    return f"{_SEGMENT_PREFIX}{seq:08d}{_SEGMENT_SUFFIX}"
+
+
+def _segment_seq(path: Path) -> int | None:
+    name = path.name
+    if not (name.startswith(_SEGMENT_PREFIX) and name.endswith(_SEGMENT_SUFFIX)):
+        return None
+    try:
+        return int(name[len(_SEGMENT_PREFIX):-len(_SEGMENT_SUFFIX)])
+    except ValueError:
+        return None
+
+
+class _Batch:
+    """Items read from the queue but not yet acknowledged, with the result of each one so far."""
+
+    def __init__(self, items: list[dict], next_seq: int, next_offset: int) -> None:
+        self.items = items
+        self.results: list[dict[str, Any] | PushFailure | None] = [None] * len(items)
+        self.next_seq = next_seq
+        self.next_offset = next_offset
+        self.attempts = 0
+
+    def pending(self) -> list[int]:
+        return [index for index, result in enumerate(self.results) if result is None]
+
+
+class Outbox:
+    """Write-ahead queue of news items on disk, drained to the backend by a background thread.
+
+    Items are appended to numbered JSONL segments and fsynced before
+    ``add`` returns. The sender reads a batch from a persisted
+    (segment, offset) cursor and pushes it. Items the backend accepted are
+    not sent again; the others are retried with exponential backoff (at
+    most ``MAX_BACKOFF_SECONDS`` apart) for as long as the backend is
+    unreachable or answers 5xx. Only items it rejects with a permanent 4xx
+    go to ``dead_letter.jsonl``; ``request_redrive`` queues them again.
+    The cursor advances once every item of the batch is settled, so a
+    restart resumes where it stopped (resending at most the unsettled batch).
+    """
+
+    def __init__(self, directory: Path, logger: logging.Logger | None = None) -> None:
+        self.directory = Path(directory)
+        self._logger = logger or logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.sent = 0
+        self.dead = 0
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._cursor_seq, self._cursor_offset = self._load_cursor()
+        seqs = self._segment_seqs()
+        self._write_seq = max(seqs + [self._cursor_seq])
+        self._repair_tail(self.directory / _segment_name(self._write_seq))
+
+    def add(self, item: dict) -> list[tuple[dict, dict[str, Any] | None]]:
+        """Durably enqueue an item; results arrive asynchronously, so nothing is returned."""
+        line = json.dumps(item, ensure_ascii=False).encode("utf-8") + b"\n"
+        with self._lock:
+            path = self.directory / _segment_name(self._write_seq)
+            if path.exists() and path.stat().st_size >= SEGMENT_BYTES:
+                self._write_seq += 1
+                path = self.directory / _segment_name(self._write_seq)
+            with path.open("ab") as handle:
+                handle.write(line)
+                handle.flush()
+                os.fsync(handle.fileno())
+        self._wakeup.set()
+        return []
+
+    def flush(self) -> list[tuple[dict, dict[str, Any] | None]]:
+        self._wakeup.set()
+        return []
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="news-outbox", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self) -> None:
+        batch: _Batch | None = None
+        while not self._stopping.is_set():
+            try:
+                batch = self._drain_once(batch)
+            except Exception as exc:  # noqa: BLE001
+                self._logger.error("Outbox sender error: %s", exc)
+                self._stopping.wait(IDLE_POLL_SECONDS)
+
+    def _drain_once(self, batch: _Batch | None) -> _Batch | None:
+        """Push the unsettled items of ``batch`` (or of a new one); return the batch still to retry."""
+        if batch is None:
+            self._take_redrive()
+            items, next_seq, next_offset = self._read_batch(max(BATCH_SIZE, 1))
+            if not items:
+                self._wakeup.wait(IDLE_POLL_SECONDS)
+                self._wakeup.clear()
+                return None
+            batch = _Batch(items, next_seq, next_offset)
+
+        pending = batch.pending()
+        results = push_news_batch_detailed([batch.items[index] for index in pending], self._logger)
+        rejected = []
+        for index, result in zip(pending, results):
+            if isinstance(result, PushFailure):
+                if not result.permanent:
+                    continue
+                rejected.append(batch.items[index])
+            batch.results[index] = result
+        if rejected:
+            self._dead_letter(rejected)
+            self._logger.error("Outbox moved %s items rejected by the backend to dead letter", len(rejected))
+
+        pending = batch.pending()
+        if pending:
+            batch.attempts += 1
+            delay = min(2 ** (batch.attempts - 1), MAX_BACKOFF_SECONDS)
+            self._logger.warning(
+                "Outbox push failed for %s of %s items (attempt %s), retrying them in %ss",
+                len(pending),
+                len(batch.items),
+                batch.attempts,
+                delay,
+            )
+            self._stopping.wait(delay)
+            return batch
+
+        accepted = [result for result in batch.results if isinstance(result, dict)]
+        if any(should_pause(result) for result in accepted):
+            self._logger.info("Backend reported already known news (created=false)")
+        self.sent += len(accepted)
+        self._advance(batch.next_seq, batch.next_offset)
+        return None
+
+    def _read_batch(self, limit: int) -> tuple[list[dict], int, int]:
+        seq, offset = self._cursor_seq, self._cursor_offset
+        items: list[dict] = []
+        while len(items) < limit:
+            path = self.directory / _segment_name(seq)
+            with self._lock:
+                newer_exists = seq < self._write_seq
+            if path.exists():
+                with path.open("rb") as handle:
+                    handle.seek(offset)
+                    while len(items) < limit:
+                        line = handle.readline()
+                        if not line.endswith(b"\n"):
+                            break
+                        offset += len(line)
+                        try:
+                            items.append(json.loads(line))
+                        except json.JSONDecodeError:
+                            self._logger.error("Skipping corrupt outbox line in %s", path.name)
+                    if len(items) >= limit:
+                        break
+            if not newer_exists:
+                break
+            # The writer has moved on, so this segment is complete.
+            seq, offset = seq + 1, 0
+        return items, seq, offset
+
+    def _advance(self, seq: int, offset: int) -> None:
+        for old in range(self._cursor_seq, seq):
+            (self.directory / _segment_name(old)).unlink(missing_ok=True)
+        self._cursor_seq, self._cursor_offset = seq, offset
+        tmp_path = self.directory / f"{_CURSOR_NAME}.tmp"
+        with tmp_path.open("w", encoding="utf-8") as handle:
+            json.dump({"segment": seq, "offset": offset}, handle)
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(tmp_path, self.directory / _CURSOR_NAME)
+
+    def _dead_letter(self, items: list[dict]) -> None:
+        self.dead += len(items)
+        with (self.directory / _DEAD_LETTER_NAME).open("a", encoding="utf-8") as handle:
+            for item in items:
+                handle.write(json.dumps(item, ensure_ascii=False))
+                handle.write("\n")
+
+    def _take_redrive(self) -> None:
+        """Move items handed over by ``request_redrive`` to the end of the queue."""
+        path = self.directory / _REDRIVE_NAME
+        if not path.exists():
+            return
+        data = path.read_bytes()
+        lines = [line + b"\n" for line in data.split(b"\n") if line.strip()]
+        with self._lock:
+            with (self.directory / _segment_name(self._write_seq)).open("ab") as handle:
+                handle.writelines(lines)
+                handle.flush()
+                os.fsync(handle.fileno())
+        path.unlink()
+        self._logger.info("Outbox re-queued %s dead-lettered items", len(lines))
+
+    def _segment_seqs(self) -> list[int]:
+        seqs = []
+        for path in self.directory.iterdir():
+            seq = _segment_seq(path)
+            if seq is not None:
+                seqs.append(seq)
+        return sorted(seqs)
+
+    def _load_cursor(self) -> tuple[int, int]:
+        path = self.directory / _CURSOR_NAME
+        if path.exists():
+            try:
+                with path.open("r", encoding="utf-8") as handle:
+                    data = json.load(handle)
+                return int(data["segment"]), int(data["offset"])
+            except (OSError, ValueError, KeyError) as exc:
+                self._logger.error("Outbox cursor unreadable, resending from oldest segment: %s", exc)
+        seqs = self._segment_seqs()
+        return (seqs[0] if seqs else 0), 0
+
+    def _repair_tail(self, path: Path) -> None:
+        """Drop a half-written last line left by a crash so new lines start clean."""
+        if not path.exists():
+            return
+        with path.open("rb+") as handle:
+            data = handle.read()
+            if not data or data.endswith(b"\n"):
+                return
+            handle.truncate(data.rfind(b"\n") + 1)
+
+
+_outboxes: dict[Path, Outbox] = {}
+_outboxes_lock = threading.Lock()
+
+
+def open_outbox(directory: Path, logger: logging.Logger | None = None) -> Outbox:
+    """Process-wide outbox for ``directory`` with its sender thread running."""
+    key = Path(directory).resolve()
+    with _outboxes_lock:
+        outbox = _outboxes.get(key)
+        if outbox is None:
+            outbox = Outbox(key, logger)
+            outbox.start()
+            _outboxes[key] = outbox
+        return outbox
+
+
+def request_redrive(directory: Path) -> int:
+    """Hand the dead-lettered items of ``directory`` back to its sender; return how many.
+
+    Safe while a parser is running: the dead-letter file is renamed
+    atomically, and the sender owning the queue appends the items to it on
+    its next pass (or on the next start).
+    """
+    directory = Path(directory)
+    dead_path = directory / _DEAD_LETTER_NAME
+    redrive_path = directory / _REDRIVE_NAME
+    if redrive_path.exists():
+        raise RuntimeError(f"A re-drive is already pending in {directory}")
+    if not dead_path.exists():
+        return 0
+    os.replace(dead_path, redrive_path)
+    with redrive_path.open("rb") as handle:
+        return sum(1 for line in handle if line.strip())
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Inspect a news outbox and re-drive its dead letters")
+    parser.add_argument("directory", type=str, help="Outbox directory, e.g. lenta/lenta_parser/data/outbox")
+    parser.add_argument("--redrive", action="store_true", help="Queue dead-lettered items for sending again")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = _parse_args()
+    directory = Path(args.directory)
+    if args.redrive:
+        print(f"re-queued {request_redrive(directory)} items", file=sys.stderr)
+        return 0
+    dead_path = directory / _DEAD_LETTER_NAME
+    dead = 0
+    if dead_path.exists():
+        with dead_path.open("rb") as handle:
+            dead = sum(1 for line in handle if line.strip())
+    print(f"dead-lettered items: {dead}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
+
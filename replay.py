@@ -0,0 +1,234 @@
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+
+import news_api
+from jsonl_index import iter_matches
+from jsonl_writer import close_writer, get_writer
+from rate_limit import TokenBucket
+from state_store import open_state
+
+
+ROOT_DIR = Path(__file__).resolve().parent
+DEFAULT_STATE = ROOT_DIR / "data" / "replay_state.sqlite3"
+PROGRESS_EVERY_SECONDS = 10.0
+CHECKPOINT_EVERY_SECONDS = 2.0
+
+logger = logging.getLogger("replay")
+
+
+def _default_archives(names: list[str]) -> list[Path]:
+    paths = []
+    if "lenta" in names:
+        from lenta.lenta_parser.config import get_config as lenta_config
+
+        paths.append(lenta_config().data_file)
+    if "ria" in names:
+        from ria.ria_parser.config import get_config as ria_config
+
+        paths.append(ria_config().data_file)
+    if "telegram" in names:
+        # telegram_parser.config insists on the backend settings, which replay takes from news_api.
+        output_path = Path(os.getenv("OUTPUT_PATH") or "data/telegram_posts.jsonl")
+        paths.append(output_path if output_path.is_absolute() else ROOT_DIR / "telegram_parser" / output_path)
+    return paths
+
+
+def _percentile(values: list[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(round(fraction * (len(ordered) - 1))), len(ordered) - 1)]
+
+
+class ReplayStats:
+    def __init__(self) -> None:
+        self.started = time.monotonic()
+        self.items = 0
+        self.requests = 0
+        self.created = 0
+        self.known = 0
+        self.failed = 0
+        self.latencies_ms: list[float] = []
+
+    def record(self, results: list, latencies_ms: list[float], requests: int) -> None:
+        self.items += len(results)
+        self.requests += requests
+        self.latencies_ms.extend(latencies_ms)
+        for result in results:
+            if result is None:
+                self.failed += 1
+            elif news_api.should_pause(result):
+                self.known += 1
+            else:
+                self.created += 1
+
+    def log(self, prefix: str) -> None:
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        logger.info(
+            "%s: items=%s (%.1f/s) requests=%s created=%s known=%s failed=%s "
+            "latency p50=%.1fms p95=%.1fms p99=%.1fms",
+            prefix,
+            self.items,
+            self.items / elapsed,
+            self.requests,
+            self.created,
+            self.known,
+            self.failed,
+            _percentile(self.latencies_ms, 0.5),
+            _percentile(self.latencies_ms, 0.95),
+            _percentile(self.latencies_ms, 0.99),
+        )
+
+
+def _send(
+    batch: list[dict],
+    batch_size: int,
+    bucket: TokenBucket | None,
+    retries: int,
+    pool_size: int,
+) -> tuple[list, list[float], int]:
+    """Push one batch, retrying failed items; returns results, latencies and count of the HTTP requests sent.
+
+    The rate limit and the latency figures apply to every HTTP request,
+    including the single pushes news_api falls back to without a batch route.
+    """
+    options = news_api.RequestOptions(pool_size=pool_size, limiter=bucket, timings=[])
+    pending = list(range(len(batch)))
+    results: list = [None] * len(batch)
+    for attempt in range(retries + 1):
+        if attempt:
+            time.sleep(min(2 ** (attempt - 1), 30))
+        items = [batch[index] for index in pending]
+        if batch_size > 1:
+            attempt_results = news_api.push_news_batch(items, logger, batch_size=batch_size, options=options)
+        else:
+            attempt_results = [news_api.push_news(items[0], logger, options=options)]
+        for index, result in zip(pending, attempt_results):
+            results[index] = result
+        pending = [index for index in pending if results[index] is None]
+        if not pending:
+            break
+    return results, [timing.total_ms for timing in options.timings], options.attempts
+
+
+def replay_file(
+    path: Path,
+    args: argparse.Namespace,
+    stats: ReplayStats,
+    executor: ThreadPoolExecutor,
+    bucket: TokenBucket | None,
+) -> None:
+    state = open_state(Path(args.state))
+    namespace = f"replay:{args.job}"
+    cursor_name = str(path.resolve())
+    start_offset = 0 if args.reset else state.get_cursor(namespace, cursor_name, 0)
+    if start_offset:
+        logger.info("Resuming %s from byte %s", path, start_offset)
+
+    batch_size = max(args.batch_size, 1)
+    # One kept-alive connection per concurrent sender.
+    pool_size = max(news_api.POOL_SIZE, args.concurrency)
+    in_flight: deque[tuple[int, list[dict], Future]] = deque()
+    max_in_flight = max(args.concurrency, 1) * 2
+    committed = start_offset
+    last_checkpoint = last_progress = time.monotonic()
+
+    def submit(batch: list[dict]) -> Future:
+        return executor.submit(_send, batch, batch_size, bucket, args.retries, pool_size)
+
+    def finish_oldest() -> None:
+        nonlocal committed, last_checkpoint, last_progress
+        end_offset, batch, future = in_flight.popleft()
+        results, latencies_ms, requests = future.result()
+        stats.record(results, latencies_ms, requests)
+        failed = [item for item, result in zip(batch, results) if result is None]
+        if failed and args.failed:
+            writer = get_writer(Path(args.failed))
+            for item in failed:
+                writer.write(item)
+        # Batches complete in submission order, so everything before end_offset is done.
+        committed = end_offset
+        now = time.monotonic()
+        if now - last_checkpoint >= CHECKPOINT_EVERY_SECONDS:
+            state.set_cursor(namespace, cursor_name, committed)
+            last_checkpoint = now
+        if now - last_progress >= PROGRESS_EVERY_SECONDS:
+            stats.log(f"Progress {path.name}")
+            last_progress = now
+
+    batch: list[dict] = []
+    batch_end = start_offset
+    for offset, length, record in iter_matches(path, args.source, args.since, args.until, start_offset):
+        batch.append(record)
+        batch_end = offset + length
+        if len(batch) < batch_size:
+            continue
+        in_flight.append((batch_end, batch, submit(batch)))
+        batch = []
+        if len(in_flight) >= max_in_flight:
+            finish_oldest()
+    if batch:
+        in_flight.append((batch_end, batch, submit(batch)))
+    while in_flight:
+        finish_oldest()
+
+    state.set_cursor(namespace, cursor_name, committed)
+    if args.failed:
+        close_writer(Path(args.failed))
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Re-push stored news archives to the backend")
+    parser.add_argument("paths", nargs="*", type=str, help="JSONL archives (default: the --archives ones)")
+    parser.add_argument(
+        "--archives",
+        type=str,
+        default="lenta,ria,telegram",
+        help="Parser archives to replay when no paths are given",
+    )
+    parser.add_argument("--source", type=str, help="Replay only this source_name")
+    parser.add_argument("--since", type=str, help="Lower date bound, ISO format")
+    parser.add_argument("--until", type=str, help="Upper date bound, ISO format")
+    parser.add_argument("--concurrency", type=int, default=4, help="Requests in flight")
+    parser.add_argument("--rate", type=float, default=20.0, help="Requests per second, 0 for unlimited")
+    parser.add_argument("--batch-size", type=int, default=news_api.BATCH_SIZE, help="Items per request, 1 disables batching")
+    parser.add_argument("--retries", type=int, default=3, help="Retries for failed items")
+    parser.add_argument("--failed", type=str, help="Append items that still failed to this JSONL file")
+    parser.add_argument("--job", type=str, default="default", help="Checkpoint name, to run independent replays")
+    parser.add_argument("--state", type=str, default=str(DEFAULT_STATE), help="Checkpoint store")
+    parser.add_argument("--reset", action="store_true", help="Ignore checkpoints and start from the beginning")
+    parser.add_argument("--log-level", type=str, default="INFO")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = _parse_args()
+    logging.basicConfig(
+        level=getattr(logging, args.log_level.upper(), logging.INFO),
+        format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+    )
+    paths = [Path(path) for path in args.paths] or _default_archives(args.archives.split(","))
+    bucket = TokenBucket(args.rate, max(args.concurrency, 1)) if args.rate > 0 else None
+
+    stats = ReplayStats()
+    with ThreadPoolExecutor(max_workers=max(args.concurrency, 1)) as executor:
+        for path in paths:
+            if not path.exists():
+                logger.warning("Archive %s not found, skipping", path)
+                continue
+            logger.info("Replaying %s", path)
+            replay_file(path, args, stats, executor, bucket)
+    stats.log("Replay finished")
+    return 1 if stats.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,22 +2,83 @@ from __future__ import annotations
 
 import re
 from datetime import datetime
-from typing import Iterable
+from html.parser import HTMLParser
+from typing import Callable, Iterable
 from urllib.parse import urljoin, urlparse
 
 from bs4 import BeautifulSoup
 
 from .config import Config
-from .utils import parse_datetime, request_with_retries, split_keywords, sanitize_tag
+from .storage import ValidatorCache
+from .utils import (
+    parse_datetime,
+    request_if_modified,
+    request_with_retries,
+    split_keywords,
+    sanitize_tag,
+)
 
 
 _NEWS_PATH_RE = re.compile(r"^/\d{8}/.+\.html$")
 _URL_DATE_RE = re.compile(r"/(\d{8})/")
+_MORE_ATTRS = ("data-next-url", "data-url", "data-ajax")
 
 
-def fetch_section_html(config: Config, url: str | None = None) -> str:
+def fetch_section_html(
+    config: Config,
+    url: str | None = None,
+    cache: ValidatorCache | None = None,
+) -> str | None:
     target = url or config.section_url
-    return request_with_retries(target, config)
+    if cache is None:
+        return request_with_retries(target, config)
+
+    html, validators = request_if_modified(target, config, cache.get(target))
+    if html is None:
+        cache.record_hit()
+    else:
+        cache.record_miss(target, validators)
+    return html
+
+
+def discover_news_urls(
+    config: Config,
+    is_fresh: Callable[[str], bool],
+    cache: ValidatorCache | None = None,
+) -> list[str] | None:
+    """Collect article urls from the section page and up to ``max_pages - 1`` "more" listings.
+
+    Returns None when the section page is unchanged (HTTP 304). Each listing
+    links to the next one by cursor, so pages are fetched one after another and
+    paging stops at the first page without fresh urls.
+
+    Skipping the listings on a 304 is safe: new articles only appear on the
+    section page, and its validators are committed only after an iteration
+    that fetched every listing it needed and processed every url found. If a
+    listing fails here, the staged validators are discarded for that reason.
+    """
+    html = fetch_section_html(config, cache=cache)
+    if html is None:
+        return None
+
+    urls, more_url = _parse_listing(html, config)
+    known = set(urls)
+    new_urls = urls
+    page = 1
+    while page < config.max_pages and more_url and any(is_fresh(url) for url in new_urls):
+        try:
+            html = request_with_retries(more_url, config)
+        except Exception:  # noqa: BLE001
+            if cache is not None:
+                cache.discard(config.section_url)
+            break
+        page += 1
+        page_urls, more_url = _parse_listing(html, config)
+        new_urls = [url for url in page_urls if url not in known]
+        known.update(new_urls)
+        urls.extend(new_urls)
+
+    return urls
 
 
 def _normalize_news_url(href: str | None, config: Config) -> str | None:
@@ -41,13 +102,36 @@ def _normalize_news_url(href: str | None, config: Config) -> str | None:
     return urljoin(config.base_url, href)
 
 
-def extract_news_urls(html: str, config: Config) -> list[str]:
-    soup = BeautifulSoup(html, "html.parser")
+class _LinkCollector(HTMLParser):
+    """Collects ``<a href>`` values in document order without building a tree.
+
+    Also keeps the first "more" listing url found in each of ``_MORE_ATTRS``.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.hrefs: list[str] = []
+        self.more_urls: dict[str, str] = {}
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        for name, value in attrs:
+            if name in _MORE_ATTRS and value and "more.html" in value:
+                self.more_urls.setdefault(name, value)
+        if tag != "a":
+            return
+        href = None
+        for name, value in attrs:
+            if name == "href":
+                href = value
+        if href:
+            self.hrefs.append(href)
+
+
+def _unique_news_urls(hrefs: Iterable[str | None], config: Config) -> list[str]:
     seen = set()
     urls: list[str] = []
 
-    for link in soup.find_all("a", href=True):
-        href = link.get("href")
+    for href in hrefs:
         url = _normalize_news_url(href, config)
         if not url:
             continue
@@ -59,6 +143,19 @@ def extract_news_urls(html: str, config: Config) -> list[str]:
     return urls
 
 
+def _parse_listing(html: str, config: Config) -> tuple[list[str], str | None]:
+    """Article urls of a listing page and the url of the next "more" listing, in one pass."""
+    collector = _LinkCollector()
+    collector.feed(html)
+    collector.close()
+    more_url = next((collector.more_urls[attr] for attr in _MORE_ATTRS if attr in collector.more_urls), None)
+    return _unique_news_urls(collector.hrefs, config), urljoin(config.base_url, more_url) if more_url else None
+
+
+def extract_news_urls(html: str, config: Config) -> list[str]:
+    return _parse_listing(html, config)[0]
+
+
 def extract_url_date(url: str) -> datetime | None:
     path = urlparse(url).path
     match = _URL_DATE_RE.search(path)
@@ -1,17 +1,66 @@
 from __future__ import annotations
 
 import logging
-import random
+import threading
 import re
 import time
+from collections import Counter
 from datetime import datetime, timezone
 from typing import Iterable
+from urllib.parse import urlparse
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
 
+from rate_limit import TokenBucket
 from .config import Config
 
 
+_session: requests.Session | None = None
+_session_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_handshakes: Counter[str] = Counter()
+_requests: Counter[str] = Counter()
+_buckets: dict[str, TokenBucket] = {}
+_buckets_lock = threading.Lock()
+
+
+def _count_handshake(host: str) -> None:
+    with _stats_lock:
+        _handshakes[host] += 1
+
+
+class _CountingHTTPConnection(HTTPConnection):
+    def connect(self) -> None:
+        _count_handshake(self.host)
+        super().connect()
+
+
+class _CountingHTTPSConnection(HTTPSConnection):
+    def connect(self) -> None:
+        _count_handshake(self.host)
+        super().connect()
+
+
+class _CountingHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _CountingHTTPConnection
+
+
+class _CountingHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _CountingHTTPSConnection
+
+
+class _PooledAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs) -> None:
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _CountingHTTPConnectionPool,
+            "https": _CountingHTTPSConnectionPool,
+        }
+
+
 MONTHS_RU = {
     "\u044f\u043d\u0432\u0430\u0440\u044f": 1,
     "\u0444\u0435\u0432\u0440\u0430\u043b\u044f": 2,
@@ -52,24 +101,84 @@ def setup_logger(config: Config) -> logging.Logger:
     return logger
 
 
-def request_with_retries(url: str, config: Config) -> str:
-    headers = {
-        "User-Agent": config.user_agent,
-        "Accept-Language": config.accept_language,
-        "Referer": config.referer,
-    }
+def get_session(config: Config) -> requests.Session:
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = _PooledAdapter(
+                pool_connections=config.pool_connections,
+                pool_maxsize=config.pool_maxsize,
+            )
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.headers.update(
+                {
+                    "User-Agent": config.user_agent,
+                    "Accept-Language": config.accept_language,
+                    "Referer": config.referer,
+                    "Connection": "keep-alive",
+                }
+            )
+            _session = session
+        return _session
+
+
+def http_stats(reset: bool = False) -> dict[str, dict[str, float]]:
+    """Requests and new connections per host since start, or since the last ``reset``."""
+    with _stats_lock:
+        hosts = set(_requests) | set(_handshakes)
+        stats = {}
+        for host in sorted(hosts):
+            requests_count = _requests[host]
+            handshakes = _handshakes[host]
+            reused = max(requests_count - handshakes, 0)
+            stats[host] = {
+                "requests": requests_count,
+                "handshakes": handshakes,
+                "reuse_ratio": reused / requests_count if requests_count else 0.0,
+            }
+        if reset:
+            _requests.clear()
+            _handshakes.clear()
+        return stats
+
+
+def log_http_stats(logger: logging.Logger) -> None:
+    """Log the iteration's HTTP counters, then start counting again."""
+    for host, stats in http_stats(reset=True).items():
+        logger.info(
+            "HTTP %s: requests=%s handshakes=%s reuse=%.0f%%",
+            host,
+            stats["requests"],
+            stats["handshakes"],
+            stats["reuse_ratio"] * 100,
+        )
+
+
+def _get_with_retries(
+    url: str,
+    config: Config,
+    headers: dict[str, str] | None = None,
+) -> requests.Response:
+    session = get_session(config)
+    host = urlparse(url).hostname or ""
+    timeout = (config.connect_timeout_seconds, config.read_timeout_seconds)
 
     last_error = None
     for attempt in range(1, config.retry_count + 1):
+        throttle(url, config)
         try:
-            response = requests.get(url, headers=headers, timeout=config.timeout_seconds)
+            with _stats_lock:
+                _requests[host] += 1
+            response = session.get(url, headers=headers, timeout=timeout)
             if response.status_code in (429, 503):
                 backoff = config.backoff_seconds * (2 ** (attempt - 1))
                 time.sleep(backoff)
                 continue
             response.raise_for_status()
             response.encoding = response.encoding or "utf-8"
-            return response.text
+            return response
         except requests.RequestException as exc:
             last_error = exc
             backoff = config.backoff_seconds * (2 ** (attempt - 1))
@@ -78,9 +187,42 @@ def request_with_retries(url: str, config: Config) -> str:
     raise RuntimeError(f"Failed to fetch {url}: {last_error}")
 
 
-def rate_limit_sleep(config: Config) -> None:
-    delay = random.uniform(config.rate_delay_min, config.rate_delay_max)
-    time.sleep(delay)
+def request_with_retries(url: str, config: Config) -> str:
+    return _get_with_retries(url, config).text
+
+
+def request_if_modified(
+    url: str,
+    config: Config,
+    validators: dict[str, str],
+) -> tuple[str | None, dict[str, str]]:
+    """Conditional GET: returns ``(None, validators)`` when the server answers 304."""
+    headers = {}
+    if validators.get("etag"):
+        headers["If-None-Match"] = validators["etag"]
+    if validators.get("last_modified"):
+        headers["If-Modified-Since"] = validators["last_modified"]
+
+    response = _get_with_retries(url, config, headers=headers)
+    if response.status_code == 304:
+        return None, validators
+
+    fresh = {}
+    if response.headers.get("ETag"):
+        fresh["etag"] = response.headers["ETag"]
+    if response.headers.get("Last-Modified"):
+        fresh["last_modified"] = response.headers["Last-Modified"]
+    return response.text, fresh
+
+
+def throttle(url: str, config: Config) -> None:
+    host = urlparse(url).hostname or ""
+    with _buckets_lock:
+        bucket = _buckets.get(host)
+        if bucket is None:
+            bucket = TokenBucket(config.requests_per_second, config.rate_burst)
+            _buckets[host] = bucket
+    bucket.acquire()
 
 
 def parse_datetime(value: str | None) -> datetime | None:
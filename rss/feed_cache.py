@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Mapping
+
+logger = logging.getLogger(__name__)
+
+
+class FeedCache:
+    """
+    Persistent ETag/Last-Modified validators for feed URLs with per-source hit/miss counters.
+
+    Validators from a fresh download are staged and only committed after the
+    source has been fully processed, so a crash mid-source re-downloads the feed.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._validators: Dict[str, Dict[str, str]] = {}
+        self._pending: Dict[str, Dict[str, str]] = {}
+        self.hits: Counter[str] = Counter()
+        self.misses: Counter[str] = Counter()
+        self._load()
+
+    def _load(self) -> None:
+        if not self.path.exists():
+            return
+        try:
+            with self.path.open("r", encoding="utf-8") as f:
+                raw = json.load(f)
+        except (OSError, json.JSONDecodeError) as exc:
+            logger.warning("Feed cache %s unreadable, starting empty: %s", self.path, exc)
+            return
+        self._validators = raw.get("validators", {})
+        self.hits.update(raw.get("hits", {}))
+        self.misses.update(raw.get("misses", {}))
+
+    def request_headers(self, url: str) -> Dict[str, str]:
+        validators = self._validators.get(url, {})
+        headers: Dict[str, str] = {}
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+        return headers
+
+    def record_hit(self, source_name: str) -> None:
+        self.hits[source_name] += 1
+
+    def record_miss(self, source_name: str, url: str, response_headers: Mapping[str, str]) -> None:
+        self.misses[source_name] += 1
+        validators: Dict[str, str] = {}
+        if response_headers.get("etag"):
+            validators["etag"] = response_headers["etag"]
+        if response_headers.get("last-modified"):
+            validators["last_modified"] = response_headers["last-modified"]
+        self._pending[url] = validators
+
+    def commit(self, url: str) -> None:
+        if url in self._pending:
+            self._validators[url] = self._pending.pop(url)
+
+    def discard(self, url: str) -> None:
+        """Drop staged validators, so the next request for ``url`` still gets the full feed."""
+        self._pending.pop(url, None)
+
+    def stats(self, source_name: str) -> tuple[int, int]:
+        return self.hits[source_name], self.misses[source_name]
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        data = {
+            "validators": self._validators,
+            "hits": dict(self.hits),
+            "misses": dict(self.misses),
+        }
+        tmp_path = self.path.with_suffix(".tmp")
+        with tmp_path.open("w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
@@ -1,18 +1,29 @@
 from __future__ import annotations
 
 import asyncio
+import hashlib
 import logging
+from datetime import datetime, timezone
 from typing import List
 
-from backend_client import BackendClient
-from config_loader import load_sources
-from core.models import SourceConfig
-from gnews_adapter import fetch_and_parse_gnews
-from rss_parser import fetch_and_parse
-from settings import Config, get_config
-
-
-async def process_source(source: SourceConfig, client: BackendClient, cfg: Config) -> None:
+from news_dedup import check_duplicate, log_pair_stats
+from state_store import StateStore, open_state
+from .backend_client import BackendClient
+from .config_loader import load_sources
+from .core.models import NewsItem, SourceConfig
+from .feed_cache import FeedCache
+from .gnews_adapter import fetch_and_parse_gnews
+from .rss_parser import fetch_and_parse
+from .settings import Config, get_config
+
+
+async def process_source(
+    source: SourceConfig,
+    client: BackendClient,
+    cfg: Config,
+    cache: FeedCache,
+    state: StateStore,
+) -> None:
     logging.info("Processing source: %s", source.name)
     if source.type == "gnews":
         items = await fetch_and_parse_gnews(
@@ -25,11 +36,26 @@ async def process_source(source: SourceConfig, client: BackendClient, cfg: Confi
             source,
             request_timeout=cfg.request_timeout,
             max_retries=cfg.max_retries,
+            cache=cache,
         )
+        if items is None:
+            hits, misses = cache.stats(source.name)
+            logging.info(
+                "Feed not modified, skipping source %s (cache hits=%s misses=%s)",
+                source.name,
+                hits,
+                misses,
+            )
+            return
 
     items_sorted = sorted(items, key=lambda i: i.date, reverse=True)
+    handled: list[str] = []
+    failed = 0
 
     for item in items_sorted:
+        key = _item_key(item)
+        if state.is_seen(source.name, key):
+            continue
         payload = {
             "title": item.header,
             "body": item.text,
@@ -37,21 +63,56 @@ async def process_source(source: SourceConfig, client: BackendClient, cfg: Confi
             "hash_tags": item.hashtags,
             "published_at": item.date.isoformat(),
         }
+        duplicate_of = await asyncio.to_thread(
+            check_duplicate,
+            {
+                "header": item.header,
+                "text": item.text,
+                "source_name": item.source_name,
+                "date": payload["published_at"],
+            },
+            logging.getLogger(__name__),
+        )
+        if duplicate_of is not None:
+            logging.info("Near-duplicate of %s, not sending (source=%s): %s", duplicate_of, source.name, item.url)
+            handled.append(key)
+            continue
+
         result = await client.save_news(payload)
 
         if result is False:
             logging.info("Backend returned created=false, stopping source %s", source.name)
+            handled.append(key)
             break
 
         if result is None:
             logging.warning("Backend error for %s, continuing", source.name)
+            failed += 1
             continue
 
+        handled.append(key)
         logging.info("Sent news to backend (source=%s, created=True)", source.name)
 
+    cursors = {"last_run_at": datetime.now(timezone.utc).isoformat()}
+    if items_sorted:
+        cursors["newest_published_at"] = items_sorted[0].date.isoformat()
+    state.checkpoint(source.name, cursors=cursors, seen=handled, ttl_seconds=cfg.seen_ttl_hours * 3600)
+    if source.rss_url:
+        if failed:
+            # A 304 next time would hide the unsent items until the feed changes.
+            logging.warning("%s items of %s were not sent, feed will be downloaded again", failed, source.name)
+            cache.discard(source.rss_url)
+        else:
+            cache.commit(source.rss_url)
     logging.info("Finished source: %s", source.name)
 
 
+def _item_key(item: NewsItem) -> str:
+    if item.url:
+        return item.url
+    return hashlib.sha1(f"{item.header}\n{item.date.isoformat()}".encode("utf-8")).hexdigest()
+
+
 async def main() -> None:
     cfg = get_config()
     setup_logging(cfg.log_level)
@@ -60,15 +121,19 @@ async def main() -> None:
         url=cfg.news_api_url,
         timeout=cfg.news_api_timeout,
     )
+    cache = FeedCache(cfg.feed_cache_path)
+    state = open_state(cfg.state_path)
     try:
         while True:
             logging.info("Starting new parsing iteration")
             sources: List[SourceConfig] = load_sources()
             for source in sources:
                 try:
-                    await process_source(source, client, cfg)
+                    await process_source(source, client, cfg, cache, state)
                 except Exception as exc:  # noqa: BLE001
                     logging.warning("Source %s failed: %s", source.name, exc)
+            cache.save()
+            log_pair_stats(logging.getLogger(__name__))
             logging.info("Sleeping for %s seconds", cfg.sleep_seconds)
             await asyncio.sleep(cfg.sleep_seconds)
     finally:
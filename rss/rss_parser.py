@@ -2,13 +2,14 @@ from __future__ import annotations
 
 import asyncio
 import logging
-from typing import List
+from typing import List, Optional
 
 import feedparser
 import httpx
 
-from core.models import SourceConfig, NewsItem
-from core.normalizer import normalize_entry, normalize_text
+from .core.models import SourceConfig, NewsItem
+from .core.normalizer import normalize_entry, normalize_text
+from .feed_cache import FeedCache
 
 logger = logging.getLogger(__name__)
 
@@ -16,8 +17,18 @@ MAX_RSS_SIZE_BYTES = 5 * 1024 * 1024  # 5 MB
 BACKOFF_BASE = 2
 
 
-async def fetch_and_parse(source: SourceConfig, request_timeout: int, max_retries: int) -> List[NewsItem]:
-    raw_data = await _download_feed(source, request_timeout, max_retries)
+async def fetch_and_parse(
+    source: SourceConfig,
+    request_timeout: int,
+    max_retries: int,
+    cache: Optional[FeedCache] = None,
+) -> Optional[List[NewsItem]]:
+    """
+    Returns None when the feed is unchanged since the last committed download (HTTP 304).
+    """
+    raw_data = await _download_feed(source, request_timeout, max_retries, cache)
+    if raw_data is None:
+        return None
     feed = feedparser.parse(raw_data)
     if feed.bozo:
         logger.warning("Feed parse warning for %s: %s", source.name, feed.bozo_exception)
@@ -36,22 +47,33 @@ async def fetch_and_parse(source: SourceConfig, request_timeout: int, max_retrie
     return items
 
 
-async def _download_feed(source: SourceConfig, request_timeout: int, max_retries: int) -> bytes:
+async def _download_feed(
+    source: SourceConfig,
+    request_timeout: int,
+    max_retries: int,
+    cache: Optional[FeedCache] = None,
+) -> Optional[bytes]:
     if not source.rss_url:
         raise ValueError(f"Source {source.name} missing rss_url")
+    headers = cache.request_headers(source.rss_url) if cache is not None else {}
     attempt = 0
     last_err: Exception | None = None
     async with httpx.AsyncClient(timeout=request_timeout) as client:
         while attempt < max_retries:
             attempt += 1
             try:
-                resp = await client.get(source.rss_url, follow_redirects=True)
+                resp = await client.get(source.rss_url, headers=headers, follow_redirects=True)
+                if resp.status_code == 304 and cache is not None:
+                    cache.record_hit(source.name)
+                    return None
                 resp.raise_for_status()
                 data = bytearray()
                 async for chunk in resp.aiter_bytes():
                     data.extend(chunk)
                     if len(data) > MAX_RSS_SIZE_BYTES:
                         raise ValueError("Feed exceeds size limit while streaming")
+                if cache is not None:
+                    cache.record_miss(source.name, source.rss_url, resp.headers)
                 return bytes(data)
             except Exception as exc:  # noqa: BLE001
                 last_err = exc
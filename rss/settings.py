@@ -2,6 +2,9 @@ from __future__ import annotations
 
 import os
 from dataclasses import dataclass
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent
 
 
 @dataclass(frozen=True)
@@ -12,6 +15,9 @@ class Config:
     news_api_url: str
     news_api_timeout: int
     log_level: str
+    feed_cache_path: Path
+    state_path: Path
+    seen_ttl_hours: int
 
 
 def _required_env(name: str) -> str:
@@ -29,6 +35,13 @@ def _required_int(name: str) -> int:
         raise RuntimeError(f"Environment variable {name} must be an integer") from exc
 
 
+def _optional_env(name: str, default: str) -> str:
+    value = os.getenv(name)
+    if value is None or value.strip() == "":
+        return default
+    return value.strip()
+
+
 def get_config() -> Config:
     return Config(
         sleep_seconds=_required_int("SLEEP_SECONDS"),
@@ -37,4 +50,7 @@ def get_config() -> Config:
         news_api_url=_required_env("NEWS_API_URL"),
         news_api_timeout=_required_int("NEWS_API_TIMEOUT"),
         log_level=_required_env("LOG_LEVEL").upper(),
+        feed_cache_path=Path(_optional_env("FEED_CACHE_PATH", str(ROOT_DIR / "data" / "feed_cache.json"))),
+        state_path=Path(_optional_env("RSS_STATE_PATH", str(ROOT_DIR / "data" / "rss_state.sqlite3"))),
+        seen_ttl_hours=int(_optional_env("RSS_SEEN_TTL_HOURS", "72")),
     )
@@ -0,0 +1,344 @@
+from __future__ import annotations
+
+import atexit
+import gzip
+import io
+import json
+import os
+import shutil
+import threading
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import IO, Iterator
+
+from jsonl_writer import MODE_BATCH, MODES, JsonlWriter, close_writer, get_writer
+from timestamps import parse_utc, utc_stamp
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional, gzip always works
+    zstandard = None
+
+
+COMPRESSIONS = ("gzip", "zstd", "none")
+_COMPRESSED_SUFFIXES = {"gzip": ".gz", "zstd": ".zst", "none": ""}
+_MANIFEST_NAME = "manifest.json"
+_COPY_CHUNK = 1024 * 1024
+
+
+@dataclass
+class SegmentInfo:
+    """Manifest entry; ``first``/``last`` bound the records' own timestamps."""
+
+    name: str
+    day: str
+    records: int = 0
+    bytes: int = 0
+    first: str | None = None
+    last: str | None = None
+    closed: bool = False
+
+    def observe(self, stamp: str, size: int) -> None:
+        self.records += 1
+        self.bytes += size
+        if self.first is None or stamp < self.first:
+            self.first = stamp
+        if self.last is None or stamp > self.last:
+            self.last = stamp
+
+    def overlaps(self, since: datetime | None, until: datetime | None) -> bool:
+        if not self.closed:
+            # The active segment's entry is only refreshed on roll or close.
+            return True
+        if not self.records:
+            return False
+        if since is not None and self.last < utc_stamp(since):
+            return False
+        if until is not None and self.first > utc_stamp(until):
+            return False
+        return True
+
+
+def _load_manifest(directory: Path) -> list[SegmentInfo]:
+    path = directory / _MANIFEST_NAME
+    if not path.exists():
+        return []
+    try:
+        with path.open("r", encoding="utf-8") as handle:
+            data = json.load(handle)
+        return [SegmentInfo(**entry) for entry in data.get("segments", [])]
+    except (OSError, ValueError, TypeError):
+        return []
+
+
+def _open_read(path: Path) -> IO[str]:
+    if path.suffix == ".gz":
+        return gzip.open(path, "rt", encoding="utf-8")
+    if path.suffix == ".zst":
+        if zstandard is None:
+            raise RuntimeError(f"{path.name} is zstd-compressed; install the zstandard package")
+        raw = zstandard.ZstdDecompressor().stream_reader(path.open("rb"))
+        return io.TextIOWrapper(raw, encoding="utf-8")
+    return path.open("r", encoding="utf-8")
+
+
+class SegmentStore:
+    """JSONL archive split into segments with a manifest.
+
+    Records go to a plain ``.jsonl`` segment through jsonl_writer, so the
+    usual fsync modes apply. The segment is closed when the UTC day changes or
+    it would grow past ``max_bytes``; closed segments are compressed and
+    listed in ``manifest.json`` with their record count and time range.
+    Closed segments whose newest record is older than ``retention_days``
+    are deleted (0 keeps everything). A directory holds a single store.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        stem: str,
+        max_bytes: int = 64 * 1024 * 1024,
+        compression: str = "gzip",
+        retention_days: int = 0,
+        time_field: str = "date",
+        fsync_mode: str = MODE_BATCH,
+        fsync_every: int = 100,
+        fsync_interval: float = 1.0,
+    ) -> None:
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Unknown compression {compression!r}, expected one of {COMPRESSIONS}")
+        if compression == "zstd" and zstandard is None:
+            raise RuntimeError("zstd compression needs the zstandard package")
+        # Segment writers are opened on the first write; fail here rather than mid-append.
+        if fsync_mode not in MODES:
+            raise ValueError(f"Unknown fsync mode {fsync_mode!r}, expected one of {MODES}")
+        self.directory = Path(directory)
+        self.stem = stem
+        self._max_bytes = max(max_bytes, 1)
+        self._compression = compression
+        self._retention_days = retention_days
+        self._time_field = time_field
+        self._fsync = (fsync_mode, fsync_every, fsync_interval)
+        self._lock = threading.Lock()
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._segments = _load_manifest(self.directory)
+        self._active: SegmentInfo | None = None
+        self._active_writer: JsonlWriter | None = None
+        self._recover()
+        self._apply_retention()
+        self._save_manifest()
+
+    def write(self, record: dict) -> None:
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        size = len(line.encode("utf-8"))
+        now = datetime.now(timezone.utc)
+        stamp = utc_stamp(parse_utc(record.get(self._time_field)) or now)
+        day = now.strftime("%Y%m%d")
+        with self._lock:
+            active = self._active
+            if active is not None and (active.day != day or (active.records and active.bytes + size > self._max_bytes)):
+                self._close_active()
+                active = None
+            if active is None:
+                active = self._open_segment(day)
+            if self._active_writer is None:
+                mode, every, interval = self._fsync
+                self._active_writer = get_writer(
+                    self.directory / active.name,
+                    mode=mode,
+                    fsync_every=every,
+                    fsync_interval=interval,
+                )
+            self._active_writer.write_line(line)
+            active.observe(stamp, size)
+
+    def close(self) -> None:
+        """Sync the active segment and persist its manifest entry; it stays open for the next run."""
+        with self._lock:
+            if self._active is not None:
+                close_writer(self.directory / self._active.name)
+            self._active_writer = None
+            self._save_manifest()
+
+    def segments(self) -> list[SegmentInfo]:
+        with self._lock:
+            return [SegmentInfo(**asdict(info)) for info in self._segments]
+
+    def _open_segment(self, day: str) -> SegmentInfo:
+        prefix = f"{self.stem}-{day}-"
+        taken = [int(info.name[len(prefix):][:3]) for info in self._segments if info.name.startswith(prefix)]
+        info = SegmentInfo(name=f"{prefix}{max(taken, default=0) + 1:03d}.jsonl", day=day)
+        self._segments.append(info)
+        self._active = info
+        # Listed before the file exists so a crash never leaves an unknown segment.
+        self._save_manifest()
+        return info
+
+    def _close_active(self) -> None:
+        info = self._active
+        self._active = None
+        self._active_writer = None
+        if info is None:
+            return
+        raw_path = self.directory / info.name
+        close_writer(raw_path)
+        self._seal(info)
+        self._apply_retention()
+        self._save_manifest()
+
+    def _seal(self, info: SegmentInfo) -> None:
+        raw_path = self.directory / info.name
+        suffix = _COMPRESSED_SUFFIXES[self._compression]
+        if suffix and raw_path.exists():
+            target = raw_path.with_name(raw_path.name + suffix)
+            self._compress(raw_path, target)
+            info.name = target.name
+        info.closed = True
+        # Manifest first, then the raw file: a crash in between leaves a
+        # leftover .jsonl that _recover removes, never a missing segment.
+        self._save_manifest()
+        if suffix:
+            raw_path.unlink(missing_ok=True)
+
+    def _compress(self, source: Path, target: Path) -> None:
+        tmp_path = target.with_name(target.name + ".tmp")
+        with source.open("rb") as src:
+            if self._compression == "zstd":
+                with zstandard.ZstdCompressor().stream_writer(tmp_path.open("wb")) as dst:
+                    shutil.copyfileobj(src, dst, _COPY_CHUNK)
+            else:
+                with gzip.open(tmp_path, "wb") as dst:
+                    shutil.copyfileobj(src, dst, _COPY_CHUNK)
+        with tmp_path.open("rb") as handle:
+            os.fsync(handle.fileno())
+        os.replace(tmp_path, target)
+
+    def _recover(self) -> None:
+        """Bring the manifest in line with the files after an unclean stop."""
+        known: list[SegmentInfo] = []
+        for info in self._segments:
+            path = self.directory / info.name
+            if info.closed:
+                if path.exists():
+                    if path.suffix != ".jsonl":
+                        # Raw copy left behind by a crash right after compression.
+                        path.with_name(path.stem).unlink(missing_ok=True)
+                    known.append(info)
+                continue
+            if path.exists():
+                self._rescan(info)
+                known.append(info)
+        self._segments = known
+
+        unclosed = [info for info in self._segments if not info.closed]
+        for info in unclosed[:-1]:
+            self._seal(info)
+        if unclosed:
+            self._active = unclosed[-1]
+
+    def _rescan(self, info: SegmentInfo) -> None:
+        path = self.directory / info.name
+        with path.open("rb+") as handle:
+            data = handle.read()
+            if data and not data.endswith(b"\n"):
+                # Drop a half-written last line.
+                data = data[: data.rfind(b"\n") + 1]
+                handle.truncate(len(data))
+        info.records, info.bytes, info.first, info.last = 0, 0, None, None
+        for raw_line in data.splitlines(keepends=True):
+            try:
+                record = json.loads(raw_line)
+            except json.JSONDecodeError:
+                continue
+            when = parse_utc(record.get(self._time_field)) if isinstance(record, dict) else None
+            info.observe(utc_stamp(when or datetime.now(timezone.utc)), len(raw_line))
+
+    def _apply_retention(self) -> None:
+        if self._retention_days <= 0:
+            return
+        cutoff = utc_stamp(datetime.now(timezone.utc) - timedelta(days=self._retention_days))
+        kept = []
+        for info in self._segments:
+            if info.closed and (not info.records or info.last < cutoff):
+                (self.directory / info.name).unlink(missing_ok=True)
+                continue
+            kept.append(info)
+        self._segments = kept
+
+    def _save_manifest(self) -> None:
+        path = self.directory / _MANIFEST_NAME
+        tmp_path = path.with_name(f"{_MANIFEST_NAME}.tmp")
+        with tmp_path.open("w", encoding="utf-8") as handle:
+            json.dump({"segments": [asdict(info) for info in self._segments]}, handle, ensure_ascii=False, indent=2)
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(tmp_path, path)
+
+
+def select_segments(
+    directory: Path,
+    since: datetime | None = None,
+    until: datetime | None = None,
+) -> list[Path]:
+    """Segment files in ``directory`` that may hold records between ``since`` and ``until``, oldest first."""
+    directory = Path(directory)
+    paths = []
+    for info in _load_manifest(directory):
+        path = directory / info.name
+        if info.overlaps(since, until) and path.exists():
+            paths.append(path)
+    return paths
+
+
+def iter_records(
+    directory: Path,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    time_field: str = "date",
+) -> Iterator[dict]:
+    """Records between ``since`` and ``until``, opening only the segments whose range overlaps."""
+    for path in select_segments(directory, since, until):
+        with _open_read(path) as handle:
+            for line in handle:
+                if not line.endswith("\n"):
+                    break
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                when = parse_utc(record.get(time_field))
+                if when is not None:
+                    if since is not None and when < parse_utc(since):
+                        continue
+                    if until is not None and when > parse_utc(until):
+                        continue
+                yield record
+
+
+_stores: dict[Path, SegmentStore] = {}
+_stores_lock = threading.Lock()
+
+
+def open_store(directory: Path, stem: str, **options) -> SegmentStore:
+    """Process-wide store for ``directory``; the first caller's stem and options win."""
+    key = Path(directory).resolve()
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = SegmentStore(key, stem, **options)
+            _stores[key] = store
+        return store
+
+
+def close_all() -> None:
+    with _stores_lock:
+        stores = list(_stores.values())
+        _stores.clear()
+    for store in stores:
+        store.close()
+
+
+# Registered after jsonl_writer's hook, so it runs first and still sees open writers.
+atexit.register(close_all)
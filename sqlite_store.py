@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+import atexit
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+
+from timestamps import utc_stamp
+
+
+ENGINE_JSONL = "jsonl"
+ENGINE_SQLITE = "sqlite"
+ENGINES = (ENGINE_JSONL, ENGINE_SQLITE)
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS news (
+    id INTEGER PRIMARY KEY,
+    source_name TEXT NOT NULL,
+    date TEXT,
+    content_hash TEXT NOT NULL,
+    header TEXT,
+    text TEXT,
+    record TEXT NOT NULL,
+    recorded_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS news_source_date ON news (source_name, date);
+CREATE INDEX IF NOT EXISTS news_date ON news (date);
+CREATE INDEX IF NOT EXISTS news_content_hash ON news (content_hash);
+"""
+
+_INSERT = (
+    "INSERT INTO news (source_name, date, content_hash, header, text, record, recorded_at) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?)"
+)
+
+
+def content_hash(record: dict) -> str:
+    payload = f"{record.get('header', '')}\n{record.get('text', '')}"
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class SqliteStore:
+    """Parser output in an SQLite database in WAL mode.
+
+    Rows are buffered and inserted in one transaction once ``batch_size``
+    are pending, and every ``flush_interval`` seconds while any are, the
+    same group-commit policy as the JSONL writer's ``batch`` mode.
+    """
+
+    def __init__(self, path: Path, batch_size: int = 100, flush_interval: float = 1.0) -> None:
+        self.path = Path(path)
+        self._batch_size = max(batch_size, 1)
+        self._flush_interval = max(flush_interval, 0.01)
+        self._lock = threading.Lock()
+        self._pending: list[tuple] = []
+        self._closed = threading.Event()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._flusher = threading.Thread(target=self._flush_loop, name=f"sqlite-{self.path.name}", daemon=True)
+        self._flusher.start()
+
+    def write(self, record: dict) -> None:
+        row = (
+            record.get("source_name") or "",
+            utc_stamp(record.get("date")) or None,
+            content_hash(record),
+            record.get("header"),
+            record.get("text"),
+            json.dumps(record, ensure_ascii=False),
+            utc_stamp(datetime.now(timezone.utc)),
+        )
+        with self._lock:
+            if self._closed.is_set():
+                raise ValueError(f"Store {self.path} is closed")
+            self._pending.append(row)
+            if len(self._pending) >= self._batch_size:
+                self._flush_locked()
+
+    def flush(self) -> None:
+        with self._lock:
+            if not self._closed.is_set():
+                self._flush_locked()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._closed.is_set():
+                return
+            self._closed.set()
+            self._flush_locked()
+            self._conn.close()
+
+    def query(
+        self,
+        source_name: str | None = None,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        limit: int | None = None,
+    ) -> list[dict]:
+        """Stored records ordered by date, optionally for one source and a [since, until] window."""
+        clauses, params = [], []
+        if source_name is not None:
+            clauses.append("source_name = ?")
+            params.append(source_name)
+        if since is not None:
+            clauses.append("date >= ?")
+            params.append(utc_stamp(since))
+        if until is not None:
+            clauses.append("date <= ?")
+            params.append(utc_stamp(until))
+        sql = "SELECT record FROM news"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY date"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        self.flush()
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def has_hash(self, digest: str) -> bool:
+        self.flush()
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM news WHERE content_hash = ? LIMIT 1", (digest,)).fetchone()
+        return row is not None
+
+    def _flush_locked(self) -> None:
+        if not self._pending:
+            return
+        self._conn.execute("BEGIN")
+        try:
+            self._conn.executemany(_INSERT, self._pending)
+            self._conn.execute("COMMIT")
+        except Exception:
+            if self._conn.in_transaction:
+                self._conn.execute("ROLLBACK")
+            raise
+        self._pending = []
+
+    def _flush_loop(self) -> None:
+        while not self._closed.wait(self._flush_interval):
+            try:
+                with self._lock:
+                    if self._pending and not self._closed.is_set():
+                        self._flush_locked()
+            except Exception as exc:  # noqa: BLE001
+                # Rows stay pending, so the next interval or write retries them.
+                logger.error("SQLite flush of %s failed: %s", self.path, exc)
+
+
+_stores: dict[Path, SqliteStore] = {}
+_stores_lock = threading.Lock()
+
+
+def open_database(path: Path, batch_size: int = 100, flush_interval: float = 1.0) -> SqliteStore:
+    """Process-wide store for ``path``; the first caller's policy wins."""
+    key = Path(path).resolve()
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = SqliteStore(key, batch_size, flush_interval)
+            _stores[key] = store
+        return store
+
+
+def close_all() -> None:
+    with _stores_lock:
+        stores = list(_stores.values())
+        _stores.clear()
+    for store in stores:
+        store.close()
+
+
+atexit.register(close_all)
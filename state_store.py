@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import atexit
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Iterable
+
+
+EXPIRE_EVERY_SECONDS = 600
+# SQLite page cache per connection, in KiB; the store never holds more than this in memory.
+CACHE_KIB = 2048
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS seen (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS seen_expires ON seen (expires_at);
+CREATE TABLE IF NOT EXISTS cursors (
+    namespace TEXT NOT NULL,
+    name TEXT NOT NULL,
+    value TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (namespace, name)
+) WITHOUT ROWID;
+"""
+
+
+class StateStore:
+    """Parser state in an embedded SQLite file: TTL seen-sets and named cursors.
+
+    Lookups go to disk through a bounded page cache, so opening the store
+    costs the same whether it holds a hundred keys or millions. Expired
+    seen-keys read as unseen and are deleted every ``EXPIRE_EVERY_SECONDS``.
+    ``checkpoint`` writes cursors and seen-keys in one transaction.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._last_expire = 0.0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(f"PRAGMA cache_size=-{CACHE_KIB}")
+        self._conn.executescript(_SCHEMA)
+
+    def is_seen(self, namespace: str, key: str) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM seen WHERE namespace = ? AND key = ? AND expires_at > ?",
+                (namespace, key, time.time()),
+            ).fetchone()
+        return row is not None
+
+    def mark_seen(self, namespace: str, keys: Iterable[str], ttl_seconds: float) -> None:
+        self.checkpoint(namespace, seen=keys, ttl_seconds=ttl_seconds)
+
+    def get_cursor(self, namespace: str, name: str, default: Any = None) -> Any:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM cursors WHERE namespace = ? AND name = ?",
+                (namespace, name),
+            ).fetchone()
+        return default if row is None else json.loads(row[0])
+
+    def all_cursors(self, namespace: str) -> dict[str, Any]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT name, value FROM cursors WHERE namespace = ?",
+                (namespace,),
+            ).fetchall()
+        return {name: json.loads(value) for name, value in rows}
+
+    def set_cursor(self, namespace: str, name: str, value: Any) -> None:
+        self.checkpoint(namespace, cursors={name: value})
+
+    def checkpoint(
+        self,
+        namespace: str,
+        cursors: dict[str, Any] | None = None,
+        seen: Iterable[str] = (),
+        ttl_seconds: float = 0.0,
+    ) -> None:
+        """Atomically update cursors and add seen-keys (valid for ``ttl_seconds``)."""
+        now = time.time()
+        cursor_rows = [
+            (namespace, name, json.dumps(value, ensure_ascii=False), now)
+            for name, value in (cursors or {}).items()
+        ]
+        seen_rows = [(namespace, key, now + ttl_seconds) for key in seen if key]
+        if not cursor_rows and not seen_rows:
+            return
+        with self._lock:
+            self._maybe_expire(now)
+            conn = self._conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany("INSERT OR REPLACE INTO cursors VALUES (?, ?, ?, ?)", cursor_rows)
+                conn.executemany("INSERT OR REPLACE INTO seen VALUES (?, ?, ?)", seen_rows)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def expire(self) -> int:
+        with self._lock:
+            return self._expire(time.time())
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _maybe_expire(self, now: float) -> None:
+        if now - self._last_expire >= EXPIRE_EVERY_SECONDS:
+            self._expire(now)
+
+    def _expire(self, now: float) -> int:
+        self._last_expire = now
+        return self._conn.execute("DELETE FROM seen WHERE expires_at <= ?", (now,)).rowcount
+
+
+_stores: dict[Path, StateStore] = {}
+_stores_lock = threading.Lock()
+
+
+def open_state(path: Path) -> StateStore:
+    """Process-wide state store for ``path``."""
+    key = Path(path).resolve()
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = StateStore(key)
+            _stores[key] = store
+        return store
+
+
+def close_all() -> None:
+    with _stores_lock:
+        stores = list(_stores.values())
+        _stores.clear()
+    for store in stores:
+        store.close()
+
+
+atexit.register(close_all)
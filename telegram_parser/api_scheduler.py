@@ -0,0 +1,51 @@
+﻿"""Concurrency limit and FloodWait handling for async Telegram API calls."""
+
+import asyncio
+import logging
+
+from telethon.errors import FloodWaitError
+
+logger = logging.getLogger(__name__)
+
+
+class RequestScheduler:
+    """Runs API calls with at most ``concurrency`` in flight, paced by ``controller``.
+
+    The rate controller spaces the calls and adapts its rate to FloodWaits.
+    A call that hits a FloodWait gives its slot back, waits the requested
+    time and is retried; calls for other channels keep running meanwhile.
+    """
+
+    def __init__(self, concurrency, controller):
+        self._slots = asyncio.Semaphore(max(concurrency, 1))
+        self.controller = controller
+        self.calls = 0
+        self.flood_waits = 0
+        self.flood_wait_seconds = 0
+
+    async def call(self, key, factory):
+        """Await ``factory()`` under the limit; ``key`` names the caller in logs."""
+        while True:
+            async with self._slots:
+                await self.controller.acquire_async()
+                self.calls += 1
+                try:
+                    result = await factory()
+                except FloodWaitError as exc:
+                    self.controller.on_flood_wait(exc.seconds)
+                    wait_seconds = exc.seconds + 1
+                else:
+                    self.controller.on_success()
+                    return result
+            self.flood_waits += 1
+            self.flood_wait_seconds += wait_seconds
+            logger.warning("FloodWait for %s, deferring this request by %s seconds", key, wait_seconds)
+            await asyncio.sleep(wait_seconds)
+
+    def log_summary(self):
+        logger.info(
+            "api calls: %s, flood waits: %s (%s seconds)",
+            self.calls,
+            self.flood_waits,
+            self.flood_wait_seconds,
+        )
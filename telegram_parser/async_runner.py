@@ -0,0 +1,168 @@
+﻿"""Asyncio run mode: channels are fetched concurrently, over one client or one per shard."""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+import logging
+import time
+
+from telethon import TelegramClient
+
+from news_api import log_timing_summary
+from news_dedup import log_pair_stats
+from . import config
+from . import entity_cache
+from . import parser as tg_parser
+from . import poll_schedule
+from . import rate_control
+from . import storage
+from .api_scheduler import RequestScheduler
+from .sharding import assign_channels, shard_name
+
+logger = logging.getLogger(__name__)
+
+
+def create_client(session_path=None):
+    session_path = config.resolve_path(session_path or config.SESSION_PATH)
+    session_path.parent.mkdir(parents=True, exist_ok=True)
+    # FloodWaits are handled by the scheduler, not slept through inside the client.
+    return TelegramClient(str(session_path), config.API_ID, config.API_HASH, flood_sleep_threshold=0)
+
+
+async def authorize(client):
+    await client.connect()
+    if await client.is_user_authorized():
+        return
+    if config.TELEGRAM_BOT_TOKEN:
+        await client.start(bot_token=config.TELEGRAM_BOT_TOKEN)
+    elif config.TELEGRAM_PHONE:
+        if not config.TELEGRAM_CODE:
+            await client.send_code_request(config.TELEGRAM_PHONE)
+            raise RuntimeError(
+                "Login code sent. Set TELEGRAM_CODE (and TELEGRAM_PASSWORD if needed) and rerun."
+            )
+
+        def _code_callback():
+            return config.TELEGRAM_CODE
+
+        await client.start(
+            phone=config.TELEGRAM_PHONE,
+            code_callback=_code_callback,
+            password=config.TELEGRAM_PASSWORD,
+        )
+    else:
+        raise RuntimeError(
+            "Set TELEGRAM_PHONE and TELEGRAM_CODE (or TELEGRAM_BOT_TOKEN) for non-interactive login."
+        )
+
+
+async def _fetch_channel(client, channel, cutoff_dt, scheduler, stop_event, account=None):
+    saved_count, channel_pause, reason = await tg_parser.fetch_new_posts_for_channel_async(
+        client,
+        channel,
+        cutoff_dt,
+        scheduler,
+        stop_event,
+        account,
+    )
+    logger.info(
+        "channel %s: %s new posts, stop reason=%s",
+        channel,
+        saved_count,
+        reason,
+    )
+    if channel_pause:
+        stop_event.set()
+    return saved_count
+
+
+async def _run_shard(name, session_path, channels, cutoff_dt, stop_event):
+    """Fetch the channels of one shard over its own account; returns the number of new posts."""
+    scheduler = RequestScheduler(config.MAX_CONCURRENT_REQUESTS, rate_control.get_controller(name))
+    started = time.monotonic()
+    client = create_client(session_path)
+    try:
+        await client.connect()
+        if not await client.is_user_authorized():
+            raise RuntimeError(
+                f"Shard session {session_path} is not authorized. Log in once with SESSION_PATH={session_path}."
+            )
+        saved = await asyncio.gather(
+            *(_fetch_channel(client, channel, cutoff_dt, scheduler, stop_event, name) for channel in channels)
+        )
+    finally:
+        await client.disconnect()
+
+    elapsed_minutes = max(time.monotonic() - started, 1.0) / 60
+    logger.info(
+        "shard %s: %s channels, %s new posts (%.1f per minute), %s api calls, "
+        "flood waits: %s (%s seconds), entity cache hits: %s",
+        name,
+        len(channels),
+        sum(saved),
+        sum(saved) / elapsed_minutes,
+        scheduler.calls,
+        scheduler.flood_waits,
+        scheduler.flood_wait_seconds,
+        entity_cache.hit_rate_text(name, reset=False),
+    )
+    return sum(saved)
+
+
+async def _run_shards(channels, cutoff_dt, stop_event):
+    sessions = {shard_name(path): path for path in config.SHARD_SESSION_PATHS}
+    shards = assign_channels(channels, list(sessions))
+    logger.info(
+        "%s shards: %s",
+        len(shards),
+        ", ".join(f"{name}={len(shard_channels)}" for name, shard_channels in shards.items()),
+    )
+    saved = await asyncio.gather(
+        *(
+            _run_shard(name, sessions[name], shard_channels, cutoff_dt, stop_event)
+            for name, shard_channels in shards.items()
+        )
+    )
+    return sum(saved)
+
+
+async def _run_single(channels, cutoff_dt, stop_event):
+    scheduler = RequestScheduler(config.MAX_CONCURRENT_REQUESTS, rate_control.get_controller())
+    client = create_client()
+    try:
+        await authorize(client)
+        saved = await asyncio.gather(
+            *(_fetch_channel(client, channel, cutoff_dt, scheduler, stop_event) for channel in channels)
+        )
+    finally:
+        await client.disconnect()
+    scheduler.log_summary()
+    return sum(saved)
+
+
+async def _run_iteration():
+    channels = storage.load_channels(config.CHANNELS_PATH)
+    logger.info("loaded %s channels, up to %s requests at once", len(channels), config.MAX_CONCURRENT_REQUESTS)
+    channels = poll_schedule.due_channels(channels)
+
+    cutoff_dt = datetime.now(timezone.utc) - timedelta(days=config.LOOKBACK_DAYS)
+    stop_event = asyncio.Event()
+    if config.SHARD_SESSION_PATHS:
+        total_saved = await _run_shards(channels, cutoff_dt, stop_event)
+    else:
+        total_saved = await _run_single(channels, cutoff_dt, stop_event)
+
+    logger.info(
+        "iteration complete, new posts: %s, entity cache hits: %s",
+        total_saved,
+        entity_cache.hit_rate_text(),
+    )
+    tg_parser.log_fetch_summary(logger)
+    rate_control.log_rates(logger)
+    log_timing_summary(logger)
+    log_pair_stats(logger, "https://t.me/")
+    return stop_event.is_set()
+
+
+def run_iteration():
+    """One concurrent pass over all channels; True when the backend asked to pause."""
+    return asyncio.run(_run_iteration())
@@ -0,0 +1,183 @@
+﻿"""Backfill of channel history over a date range through a takeout session.
+
+    python -m telegram_parser.backfill @channel --since 2024-01-01 --until 2024-03-01
+
+Takeout sessions have much higher request limits than regular ones, so
+history is read oldest first in large batches and stored through the
+same archive and outbox as polled posts. After each stored batch the last
+message id is checkpointed in ``STATE_PATH``; rerunning the same command
+resumes from there.
+"""
+
+import argparse
+import asyncio
+from datetime import datetime, timezone
+import logging
+import sys
+
+from telethon.errors import ChannelInvalidError, FloodWaitError, PeerIdInvalidError, TakeoutInitDelayError
+
+from jsonl_writer import exit_on_sigterm
+from news_api import log_timing_summary
+from . import async_runner
+from . import config
+from . import entity_cache
+from . import parser as tg_parser
+from . import rate_control
+from . import storage
+from .sharding import shard_name
+
+# Not a valid channel username, so it cannot clash with a channel namespace.
+NAMESPACE = "backfill-progress"
+BATCH_SIZE = 1000
+# Telegram returns at most this many messages per history request.
+PAGE_SIZE = 100
+
+logger = logging.getLogger(__name__)
+
+
+def _parse_date(value):
+    """Aware UTC datetime from an ISO date or datetime; naive means UTC."""
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+async def _get_entity(takeout, channel, cache, refresh=False):
+    entity = None if refresh else cache.get(channel)
+    if entity is None:
+        entity = cache.put(channel, await takeout.get_entity(channel))
+    return entity
+
+
+async def _get_page(takeout, entity, offset, limit, controller):
+    """One history request of up to ``PAGE_SIZE`` messages, paced by ``controller``."""
+    while True:
+        await controller.acquire_async()
+        try:
+            messages = await takeout.get_messages(entity, limit=limit, reverse=True, **offset)
+        except FloodWaitError as exc:
+            controller.on_flood_wait(exc.seconds)
+            logger.warning("FloodWait during takeout, sleeping %s seconds", exc.seconds + 1)
+            await asyncio.sleep(exc.seconds + 1)
+            continue
+        controller.on_success()
+        return messages
+
+
+async def _get_batch(takeout, entity, last_id, since_dt, batch_size, controller):
+    """Next ``batch_size`` messages, oldest first, after ``last_id`` or else after ``since_dt``.
+
+    Fetched one request at a time, so the controller paces every API call
+    rather than Telethon splitting a large limit into unpaced requests.
+    """
+    offset = {"offset_id": last_id} if last_id else {"offset_date": since_dt}
+    messages = []
+    while len(messages) < batch_size:
+        limit = min(PAGE_SIZE, batch_size - len(messages))
+        page = await _get_page(takeout, entity, offset, limit, controller)
+        messages.extend(page)
+        if len(page) < limit:
+            break
+        offset = {"offset_id": page[-1].id}
+    return messages
+
+
+async def backfill_channel(takeout, channel, since_dt, until_dt, batch_size=BATCH_SIZE, reset=False):
+    """Store the posts of ``channel`` dated after ``since_dt`` up to ``until_dt``; return how many this run saved."""
+    state = storage.open_state_store()
+    name = f"{channel} {since_dt.isoformat()} {until_dt.isoformat()}"
+    progress = {"last_id": 0, "saved": 0, "done": False}
+    if not reset:
+        progress = state.get_cursor(NAMESPACE, name) or progress
+    if progress["done"]:
+        logger.info("backfill of %s for this range is already complete, %s posts saved", channel, progress["saved"])
+        return 0
+    if progress["last_id"]:
+        logger.info("resuming backfill of %s after message %s", channel, progress["last_id"])
+
+    # Takeout limits are separate from the regular ones, so they get their own controller.
+    controller = rate_control.get_controller(f"{shard_name(config.SESSION_PATH)}-takeout")
+    cache = entity_cache.get_cache()
+    entity = await _get_entity(takeout, channel, cache)
+    refreshed = False
+    saved = 0
+    while not progress["done"]:
+        try:
+            messages = await _get_batch(takeout, entity, progress["last_id"], since_dt, batch_size, controller)
+        except (ChannelInvalidError, PeerIdInvalidError):
+            # A fresh entity that is rejected too will not get better by resolving again.
+            if refreshed:
+                raise
+            logger.warning("cached entity of %s was rejected, resolving again", channel)
+            entity = await _get_entity(takeout, channel, cache, refresh=True)
+            refreshed = True
+            continue
+        in_range = [message for message in messages if message.date is not None and message.date <= until_dt]
+        if in_range:
+            batch_saved, failed_id = await asyncio.to_thread(tg_parser.store_backfilled_messages, channel, in_range)
+            saved += batch_saved
+            progress["saved"] += batch_saved
+            if failed_id is not None:
+                # Resume at the failed message; the ones pushed after it are skipped as seen.
+                progress["last_id"] = failed_id - 1
+                state.set_cursor(NAMESPACE, name, progress)
+                logger.error("backfill %s: pushing message %s failed, stopping; rerun to continue", channel, failed_id)
+                return saved
+            progress["last_id"] = in_range[-1].id
+        progress["done"] = len(in_range) < len(messages) or len(messages) < batch_size
+        # Only after the batch is stored, so an interruption repeats at most one batch.
+        state.set_cursor(NAMESPACE, name, progress)
+        logger.info(
+            "backfill %s: %s posts saved, reached %s",
+            channel,
+            progress["saved"],
+            in_range[-1].date.isoformat() if in_range else until_dt.isoformat(),
+        )
+    return saved
+
+
+async def _run(args):
+    since_dt = _parse_date(args.since)
+    until_dt = _parse_date(args.until)
+    client = async_runner.create_client()
+    try:
+        await async_runner.authorize(client)
+        try:
+            async with client.takeout(finalize=True, channels=True, megagroups=True) as takeout:
+                for channel in args.channels:
+                    saved = await backfill_channel(takeout, channel, since_dt, until_dt, args.batch_size, args.reset)
+                    logger.info("backfill of %s done, %s new posts", channel, saved)
+        except TakeoutInitDelayError as exc:
+            logger.error(
+                "takeout must be confirmed in the Telegram app (Settings > Privacy), then rerun in %s seconds",
+                exc.seconds,
+            )
+            return 1
+    finally:
+        await client.disconnect()
+    rate_control.log_rates(logger)
+    log_timing_summary(logger)
+    return 0
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description="Backfill Telegram channel history through a takeout session")
+    parser.add_argument("channels", nargs="+", help="Channel usernames or links")
+    parser.add_argument("--since", required=True, help="Lower date bound, ISO format (naive means UTC)")
+    parser.add_argument("--until", required=True, help="Upper date bound, ISO format (naive means UTC)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Messages per batch and checkpoint")
+    parser.add_argument("--reset", action="store_true", help="Ignore the checkpoint and start from --since")
+    return parser.parse_args()
+
+
+def main():
+    args = _parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s %(message)s")
+    exit_on_sigterm()
+    return asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,6 +3,10 @@
 from pathlib import Path
 import os
 
+from jsonl_writer import MODES
+from segment_store import COMPRESSIONS
+from sqlite_store import ENGINES
+
 BASE_DIR = Path(__file__).resolve().parent
 
 
@@ -59,15 +63,50 @@ SESSION_PATH = _get_env("SESSION_PATH", "data/telegram.session")
 CHANNELS_PATH = _get_env("CHANNELS_PATH", "data/channels.txt")
 OUTPUT_DIR = _get_env("OUTPUT_DIR", "data/telegram_posts")
 OUTPUT_PATH = _get_env("OUTPUT_PATH", "data/telegram_posts.jsonl")
-INDEX_PATH = _get_env("INDEX_PATH", "data/telegram_index.txt")
+STATE_PATH = _get_env("STATE_PATH", "data/telegram_state.sqlite3")
+OUTBOX_DIR = _get_env("OUTBOX_DIR", "data/outbox")
+OUTBOX_ENABLED = _get_env("OUTBOX_ENABLED", "1") == "1"
+FSYNC_MODE = _get_env("FSYNC_MODE", "batch").lower()
+if FSYNC_MODE not in MODES:
+    raise RuntimeError(f"Environment variable FSYNC_MODE must be one of {', '.join(MODES)}")
+FSYNC_EVERY = _get_env("FSYNC_EVERY", 100, int)
+FSYNC_INTERVAL_SECONDS = _get_env("FSYNC_INTERVAL_SECONDS", 1.0, float)
+OFFSET_INDEX = _get_env("OFFSET_INDEX", "1") == "1"
+SEGMENTED_STORAGE = _get_env("SEGMENTED_STORAGE", "0") == "1"
+SEGMENTS_DIR = _get_env("SEGMENTS_DIR", "data/telegram_segments")
+SEGMENT_MAX_MB = _get_env("SEGMENT_MAX_MB", 64, int)
+SEGMENT_COMPRESSION = _get_env("SEGMENT_COMPRESSION", "gzip").lower()
+if SEGMENT_COMPRESSION not in COMPRESSIONS:
+    raise RuntimeError(f"Environment variable SEGMENT_COMPRESSION must be one of {', '.join(COMPRESSIONS)}")
+RETENTION_DAYS = _get_env("RETENTION_DAYS", 0, int)
+STORAGE_ENGINE = _get_env("STORAGE_ENGINE", "jsonl").lower()
+if STORAGE_ENGINE not in ENGINES:
+    raise RuntimeError(f"Environment variable STORAGE_ENGINE must be one of {', '.join(ENGINES)}")
+SQLITE_PATH = _get_env("SQLITE_PATH", "data/telegram_posts.sqlite3")
 ERROR_LOG_PATH = _get_env("ERROR_LOG_PATH", "logs/telegram_errors.log")
 POLL_INTERVAL_MINUTES = _get_env("POLL_INTERVAL_MINUTES", 10, int)
 LOOKBACK_DAYS = _get_env("LOOKBACK_DAYS", 2, int)
 CHANNEL_SWITCH_DELAY_SECONDS = _get_env("CHANNEL_SWITCH_DELAY_SECONDS", 5, int)
+RUN_MODE = _get_env("RUN_MODE", "sync").lower()
+MAX_CONCURRENT_REQUESTS = _get_env("MAX_CONCURRENT_REQUESTS", 8, int)
+STREAM_CATCHUP_MINUTES = _get_env("STREAM_CATCHUP_MINUTES", 30, int)
+CATCHUP_METHOD = _get_env("CATCHUP_METHOD", "history").lower()
+ENTITY_CACHE_TTL_DAYS = _get_env("ENTITY_CACHE_TTL_DAYS", 30, int)
+SHARD_SESSION_PATHS = [item.strip() for item in _get_env("SHARD_SESSION_PATHS", "").split(",") if item.strip()]
+ADAPTIVE_POLLING = _get_env("ADAPTIVE_POLLING", "0") == "1"
+POLL_MIN_MINUTES = _get_env("POLL_MIN_MINUTES", 2, float)
+POLL_MAX_MINUTES = _get_env("POLL_MAX_MINUTES", 360, float)
+API_BUDGET_PER_HOUR = _get_env("API_BUDGET_PER_HOUR", 600, int)
 REQUEST_DELAY_RANGE = _parse_float_pair(
     os.getenv("REQUEST_DELAY_RANGE"),
     (2.0, 7.0),
 )
+# Calls per second; by default one call per average REQUEST_DELAY_RANGE pause.
+RATE_INITIAL = _get_env("RATE_INITIAL", 2.0 / max(sum(REQUEST_DELAY_RANGE), 0.1), float)
+RATE_MIN = _get_env("RATE_MIN", 0.05, float)
+RATE_MAX = _get_env("RATE_MAX", 5.0, float)
+RATE_INCREASE = _get_env("RATE_INCREASE", 0.01, float)
+RATE_DECREASE = _get_env("RATE_DECREASE", 0.5, float)
 
 LOG_PATH = os.getenv("LOG_PATH")
 TELEGRAM_PHONE = os.getenv("TELEGRAM_PHONE")
@@ -0,0 +1,96 @@
+﻿"""Resolved channel peers cached in the parser state store."""
+
+import logging
+import threading
+import time
+
+from telethon.tl import types
+from telethon.utils import get_input_peer
+
+from . import config
+from . import storage
+
+logger = logging.getLogger(__name__)
+
+# Not a valid channel username, so it cannot clash with a channel namespace.
+NAMESPACE = "entity-cache"
+
+
+class EntityCache:
+    """Input peers (id + access_hash) of channels, valid for ``ttl_seconds``.
+
+    A cached peer lets requests go straight to the channel without a
+    ``contacts.resolveUsername`` call, the most rate-limited request the
+    parser makes. Entries outlive restarts; callers drop an entry when
+    Telegram rejects the cached peer. Hits and lookups are counted until
+    ``take_stats`` is called. Access hashes are only valid for the
+    account that resolved them, so each shard account has its own cache.
+    """
+
+    def __init__(self, state, ttl_seconds, namespace=NAMESPACE):
+        self._state = state
+        self._namespace = namespace
+        self._ttl = ttl_seconds
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._lookups = 0
+
+    def get(self, channel):
+        entry = self._state.get_cursor(self._namespace, channel)
+        hit = bool(entry) and time.time() - entry["resolved_at"] < self._ttl
+        with self._lock:
+            self._lookups += 1
+            self._hits += int(hit)
+        if not hit:
+            return None
+        return types.InputPeerChannel(entry["id"], entry["access_hash"])
+
+    def put(self, channel, entity):
+        peer = get_input_peer(entity)
+        if not isinstance(peer, types.InputPeerChannel):
+            return peer
+        self._state.set_cursor(
+            self._namespace,
+            channel,
+            {"id": peer.channel_id, "access_hash": peer.access_hash, "resolved_at": time.time()},
+        )
+        return peer
+
+    def drop(self, channel):
+        self._state.set_cursor(self._namespace, channel, None)
+
+    def take_stats(self, reset=True):
+        """``(hits, lookups)`` since the previous reset."""
+        with self._lock:
+            stats = (self._hits, self._lookups)
+            if reset:
+                self._hits = self._lookups = 0
+        return stats
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(account=None):
+    """Process-wide cache of ``account`` (a shard name; None for ``SESSION_PATH``)."""
+    with _caches_lock:
+        cache = _caches.get(account)
+        if cache is None:
+            namespace = NAMESPACE if account is None else f"{NAMESPACE}:{account}"
+            cache = EntityCache(storage.open_state_store(), config.ENTITY_CACHE_TTL_DAYS * 86400, namespace)
+            _caches[account] = cache
+        return cache
+
+
+def hit_rate_text(account=None, reset=True):
+    """Hit rate since the last reset, for the iteration log line; all accounts when None."""
+    with _caches_lock:
+        caches = list(_caches.values()) if account is None else [_caches.get(account)]
+    hits = lookups = 0
+    for cache in caches:
+        if cache is not None:
+            cache_hits, cache_lookups = cache.take_stats(reset)
+            hits += cache_hits
+            lookups += cache_lookups
+    return f"{hits}/{lookups} ({100.0 * hits / max(lookups, 1):.0f}%)"
@@ -1,47 +1,163 @@
 ﻿"""Telegram parsing logic."""
 
+import asyncio
 from datetime import datetime, timedelta, timezone
 import logging
-import random
+import threading
 import time
 
-from telethon.errors import FloodWaitError, RPCError
+from telethon.errors import (
+    ChannelInvalidError,
+    FloodWaitError,
+    PeerIdInvalidError,
+    PersistentTimestampEmptyError,
+    PersistentTimestampInvalidError,
+    PersistentTimestampOutdatedError,
+    RPCError,
+    UsernameInvalidError,
+    UsernameNotOccupiedError,
+)
+from telethon.tl import types
+from telethon.tl.functions.channels import GetFullChannelRequest
+from telethon.tl.functions.updates import GetChannelDifferenceRequest
+from telethon.tl.tlobject import TLObject
 
 from . import config
+from . import entity_cache
+from . import rate_control
 from . import storage
 from . import utils
-from news_api import push_news, should_pause
+from news_api import NewsBatcher, should_pause
+from news_dedup import check_duplicate
+from news_outbox import open_outbox
 
 logger = logging.getLogger(__name__)
 
+PAGE_SIZE = 100
+DIFFERENCE_LIMIT = 100
+# Post timestamps kept per channel for the polling schedule.
+RECENT_POSTS = 20
+_RETRY_DELAYS = [1, 2, 4]
+_PTS_ERRORS = (PersistentTimestampEmptyError, PersistentTimestampInvalidError, PersistentTimestampOutdatedError)
+# The cached access_hash was rejected: resolve the username again.
+_STALE_PEER_ERRORS = (ChannelInvalidError, PeerIdInvalidError)
+# The username no longer points to a channel.
+_GONE_ERRORS = (UsernameInvalidError, UsernameNotOccupiedError)
 
-def _sleep_with_jitter():
-    delay = random.uniform(*config.REQUEST_DELAY_RANGE)
-    time.sleep(delay)
+_totals_lock = threading.Lock()
+_totals = {"channels": 0, "requests": 0, "bytes": 0}
 
 
-def _get_messages_with_retries(client, entity, channel, offset_id):
-    delays = [1, 2, 4]
-    for attempt, delay in enumerate(delays, 1):
+def _news_sink():
+    if config.OUTBOX_ENABLED:
+        return open_outbox(config.resolve_path(config.OUTBOX_DIR), logger)
+    return NewsBatcher(logger)
+
+
+def _page_request(offset_id, min_id):
+    if min_id:
+        # Oldest first, so the high-water mark can advance message by message.
+        return {"limit": PAGE_SIZE, "min_id": min_id, "reverse": True}
+    return {"limit": PAGE_SIZE, "offset_id": offset_id}
+
+
+def _response_bytes(result):
+    """Serialized TL size of an API result, a measure of the traffic it cost."""
+    if isinstance(result, TLObject):
+        return len(bytes(result))
+    if isinstance(result, list):
+        return sum(_response_bytes(item) for item in result)
+    return 0
+
+
+def log_fetch_summary(log):
+    """Log and reset request and traffic totals of the channels fetched since the last call."""
+    with _totals_lock:
+        totals = dict(_totals)
+        for key in _totals:
+            _totals[key] = 0
+    log.info(
+        "fetch summary: %s channels, %s requests, %s bytes received, catch-up method %s",
+        totals["channels"],
+        totals["requests"],
+        totals["bytes"],
+        config.CATCHUP_METHOD,
+    )
+
+
+def _log_network_error(channel, attempt, exc):
+    logger.warning(
+        "network error while fetching %s (attempt %s/%s): %s",
+        channel,
+        attempt,
+        len(_RETRY_DELAYS),
+        exc,
+    )
+
+
+def _call_with_retries(channel, func):
+    for attempt, delay in enumerate(_RETRY_DELAYS, 1):
         try:
-            return client.get_messages(entity, limit=100, offset_id=offset_id)
+            return func()
         except FloodWaitError:
             raise
         except RPCError:
             raise
         except Exception as exc:
-            logger.warning(
-                "network error while fetching %s (attempt %s/%s): %s",
-                channel,
-                attempt,
-                len(delays),
-                exc,
-            )
-            if attempt == len(delays):
+            _log_network_error(channel, attempt, exc)
+            if attempt == len(_RETRY_DELAYS):
                 raise
             time.sleep(delay)
 
 
+async def _call_async(channel, func, scheduler):
+    for attempt, delay in enumerate(_RETRY_DELAYS, 1):
+        try:
+            return await scheduler.call(channel, func)
+        except RPCError:
+            raise
+        except Exception as exc:
+            _log_network_error(channel, attempt, exc)
+            if attempt == len(_RETRY_DELAYS):
+                raise
+            await asyncio.sleep(delay)
+
+
+def _paced_call(run, func):
+    """One sync API call paced by the rate controller of the run's account."""
+    controller = rate_control.get_controller(run.account)
+    controller.acquire()
+    run.request_count += 1
+    try:
+        result = _call_with_retries(run.channel, func)
+    except FloodWaitError as exc:
+        controller.on_flood_wait(exc.seconds)
+        raise
+    controller.on_success()
+    return result
+
+
+def _request(run, func):
+    """Sync API call on behalf of ``run``; FloodWaits are slept through."""
+    while True:
+        try:
+            result = _paced_call(run, func)
+        except FloodWaitError as exc:
+            wait_seconds = exc.seconds + 1
+            logger.warning("FloodWait for %s, sleeping %s seconds", run.channel, wait_seconds)
+            time.sleep(wait_seconds)
+            continue
+        run.received_bytes += _response_bytes(result)
+        return result
+
+
+async def _request_async(run, func, scheduler):
+    run.request_count += 1
+    result = await _call_async(run.channel, func, scheduler)
+    run.received_bytes += _response_bytes(result)
+    return result
+
+
 def _build_item(channel, message):
     text = message.raw_text or ""
     header = text.splitlines()[0] if text else ""
@@ -55,49 +171,84 @@ def _build_item(channel, message):
     }
 
 
-def fetch_new_posts_for_channel(client, channel, cutoff_dt):
-    output_path = config.resolve_path(config.OUTPUT_PATH)
-    saved_count = 0
-    pause_requested = False
-    stop_reason = None
-    try:
-        entity = client.get_entity(channel)
-    except Exception:
-        logger.exception("failed to resolve channel entity: %s", channel)
-        return saved_count, pause_requested, "error"
+class _ChannelRun:
+    """Progress of one channel fetch, driven by the sync or the async loop.
 
-    offset_id = 0
-    while True:
-        try:
-            messages = _get_messages_with_retries(client, entity, channel, offset_id)
-        except FloodWaitError as exc:
-            wait_seconds = exc.seconds + 1
-            logger.warning("FloodWait for %s, sleeping %s seconds", channel, wait_seconds)
-            time.sleep(wait_seconds)
-            continue
-        except RPCError:
-            logger.exception("RPC error while fetching %s", channel)
-            return saved_count, pause_requested, "error"
-        except Exception:
-            logger.exception("unexpected error while fetching %s", channel)
-            return saved_count, pause_requested, "error"
+    Channels with a stored ``max_message_id`` are read incrementally: only
+    messages newer than it are requested, oldest first, and the mark moves
+    past each handled message. Channels seen for the first time are
+    scanned newest first back to ``cutoff_dt``; their mark is stored only
+    once that scan completes, so an interrupted scan is repeated.
 
-        if not messages:
-            break
+    With ``CATCHUP_METHOD=difference`` known channels are caught up from
+    their stored update state (``pts``) through the channel-difference
+    API, which returns only new and edited messages. The new ``pts`` is
+    stored only when the run completes.
+    """
 
-        for message in messages:
-            if message is None or message.id is None or message.date is None:
-                continue
-            if message.date < cutoff_dt:
-                stop_reason = "older_than_lookback"
-                break
+    def __init__(self, channel, cutoff_dt, account=None):
+        self.channel = channel
+        self.account = account
+        self.cutoff_dt = cutoff_dt
+        self.output_path = config.resolve_path(config.OUTPUT_PATH)
+        self.state = storage.open_state_store()
+        self.seen_ttl = timedelta(days=config.LOOKBACK_DAYS + 1).total_seconds()
+        self.max_message_id = self.state.get_cursor(channel, "max_message_id", 0)
+        self.incremental = self.max_message_id > 0
+        self.mode = "incremental" if self.incremental else "lookback"
+        self.newest_id = self.max_message_id
+        self.start_pts = self.state.get_cursor(channel, "pts")
+        self.post_times = []
+        self.pts = self.start_pts
+        self.too_long = False
+        self.offset_id = 0
+        self.saved_count = 0
+        self.request_count = 0
+        self.received_bytes = 0
+        self.pause_requested = False
+        self.stop_reason = None
+        self.batcher = _news_sink()
+        # Direct pushes by id(item) until their result is known: (seen key, message id).
+        self.pending = {}
+        self.failed_ids = []
 
-            item = _build_item(channel, message)
-            if not item.get("header") or not item.get("text"):
-                continue
-            result = push_news(item, logger)
-            storage.append_jsonl(
-                output_path,
+    @property
+    def min_id(self):
+        return self.newest_id if self.incremental else 0
+
+    @property
+    def use_difference(self):
+        return self.incremental and self.pts is not None
+
+    def history_request(self):
+        return _page_request(self.offset_id, self.min_id)
+
+    def difference_request(self, entity):
+        return GetChannelDifferenceRequest(
+            channel=entity,
+            filter=types.ChannelMessagesFilterEmpty(),
+            pts=self.pts,
+            limit=DIFFERENCE_LIMIT,
+            force=True,
+        )
+
+    def _store(self, message, key):
+        """Save and push ``message`` unless ``key`` was seen.
+
+        ``key`` is marked seen once the post is queued in the outbox or,
+        without one, once the backend accepted it. The archive copy has its
+        own key, so a post whose push is retried is archived only once.
+        """
+        channel = self.channel
+        if self.state.is_seen(channel, key):
+            return
+        item = _build_item(channel, message)
+        if not item.get("header") or not item.get("text"):
+            return
+        archived_key = f"archived:{key}"
+        if not self.state.is_seen(channel, archived_key):
+            storage.append_post(
+                self.output_path,
                 {
                     "header": item["header"],
                     "text": item["text"],
@@ -106,20 +257,337 @@ def fetch_new_posts_for_channel(client, channel, cutoff_dt):
                     "source_name": item["source_name"],
                 },
             )
-            if should_pause(result):
-                stop_reason = "backend_pause"
-                pause_requested = True
+            self.state.mark_seen(channel, [archived_key], self.seen_ttl)
+            self.saved_count += 1
+        duplicate_of = check_duplicate(item, logger)
+        if duplicate_of is not None:
+            logger.info("near-duplicate of %s, not pushing: %s/%s", duplicate_of, channel, message.id)
+            self.state.mark_seen(channel, [key], self.seen_ttl)
+            return
+        if config.OUTBOX_ENABLED:
+            # Durably queued; the outbox keeps retrying until the backend takes it.
+            self.state.mark_seen(channel, [key], self.seen_ttl)
+        else:
+            self.pending[id(item)] = (key, message.id)
+        self._settle(self.batcher.add(item))
+
+    def _settle(self, results):
+        """Mark pushed posts seen and remember failed ones; note a pause asked for by the backend."""
+        for item, result in results:
+            key, message_id = self.pending.pop(id(item))
+            if result is None:
+                self.failed_ids.append(message_id)
+            else:
+                self.state.mark_seen(self.channel, [key], self.seen_ttl)
+        if any(should_pause(result) for _, result in results):
+            self.stop_reason = "backend_pause"
+            self.pause_requested = True
+
+    def handle_page(self, messages):
+        """Store and push one page; return True when the next page should be requested."""
+        if not messages:
+            return False
+        for message in messages:
+            if message is None or message.id is None or message.date is None:
+                continue
+            if message.date < self.cutoff_dt:
+                if self.incremental:
+                    self.newest_id = max(self.newest_id, message.id)
+                    continue
+                self.stop_reason = "older_than_lookback"
                 break
-            saved_count += 1
-            _sleep_with_jitter()
+            self.newest_id = max(self.newest_id, message.id)
+            if message.id > self.max_message_id:
+                self.post_times.append(message.date.timestamp())
 
-        if stop_reason:
+            self._store(message, str(message.id))
+            if self.stop_reason:
+                break
+
+        if self.stop_reason or len(messages) < PAGE_SIZE:
+            return False
+        if not self.incremental:
+            self.offset_id = messages[-1].id
+        return True
+
+    def handle_edits(self, messages):
+        """Store edited versions of posts inside the lookback window, once per edit."""
+        for message in messages:
+            if not isinstance(message, types.Message) or message.edit_date is None:
+                continue
+            if message.date is None or message.date < self.cutoff_dt:
+                continue
+            self._store(message, f"{message.id}:edit:{int(message.edit_date.timestamp())}")
+            if self.stop_reason:
+                break
+
+    def handle_difference(self, difference):
+        """Apply one channel-difference chunk; return True when another chunk should be requested."""
+        self.mode = "difference"
+        if isinstance(difference, types.updates.ChannelDifferenceTooLong):
+            # Too many updates since the stored pts: rescan history from max_message_id instead.
+            self.pts = difference.dialog.pts
+            self.too_long = True
+            self.mode = "difference, history fallback"
+            return False
+        self.pts = difference.pts
+        if isinstance(difference, types.updates.ChannelDifference):
+            messages = [message for message in difference.new_messages if isinstance(message, types.Message)]
+            self.handle_page(sorted(messages, key=lambda message: message.id))
+            # New messages already arrive in their edited form.
+            new_ids = {message.id for message in messages}
+            if not self.stop_reason:
+                self.handle_edits(
+                    [
+                        update.message
+                        for update in difference.other_updates
+                        if isinstance(update, types.UpdateEditChannelMessage) and update.message.id not in new_ids
+                    ]
+                )
+        return not self.stop_reason and not difference.final
+
+    def reset_pts(self, pts):
+        """Start difference catch-up from ``pts`` after the history scan of this run."""
+        self.pts = pts
+        self.start_pts = None
+
+    def recent_posts(self):
+        """Stored post timestamps of the channel merged with those seen in this run."""
+        recent = self.state.get_cursor(self.channel, "recent_posts") or []
+        return sorted(set(recent + self.post_times))[-RECENT_POSTS:]
+
+    def finish(self):
+        self._settle(self.batcher.flush())
+
+        if self.stop_reason is None:
+            self.stop_reason = "done"
+
+        completed = self.stop_reason in ("done", "older_than_lookback")
+        if self.failed_ids:
+            # Fetch again from the first failed push; posts pushed after it are skipped as seen.
+            logger.warning(
+                "channel %s: %s pushes failed, retrying from message %s",
+                self.channel,
+                len(self.failed_ids),
+                min(self.failed_ids),
+            )
+            self.newest_id = min(self.newest_id, min(self.failed_ids) - 1)
+        # A partial first scan went newest first and left older posts behind.
+        if self.incremental or completed:
+            self.max_message_id = self.newest_id
+        cursors = {
+            "max_message_id": self.max_message_id,
+            "last_run_at": utils.utc_now_iso(),
+            "stop_reason": self.stop_reason,
+        }
+        # The difference from a newer pts would not return the failed posts again.
+        pts = self.pts if completed and not self.failed_ids else self.start_pts
+        if pts is not None:
+            cursors["pts"] = pts
+        if self.post_times:
+            cursors["recent_posts"] = self.recent_posts()
+        if self.request_count:
+            average = self.state.get_cursor(self.channel, "requests_per_poll")
+            cursors["requests_per_poll"] = (
+                self.request_count if average is None else 0.7 * average + 0.3 * self.request_count
+            )
+        if self.request_count:
+            logger.info(
+                "channel %s: %s requests, %s bytes, %s mode, max message id %s",
+                self.channel,
+                self.request_count,
+                self.received_bytes,
+                self.mode,
+                self.max_message_id,
+            )
+        with _totals_lock:
+            _totals["channels"] += 1
+            _totals["requests"] += self.request_count
+            _totals["bytes"] += self.received_bytes
+        self.state.checkpoint(self.channel, cursors=cursors)
+        return self.saved_count, self.pause_requested, self.stop_reason
+
+
+def store_streamed_message(channel, message):
+    """Store and push one message delivered by a NewMessage update; return how many were saved.
+
+    This is not a channel run: only ``max_message_id`` and the post times
+    are updated, and the fetch totals and run cursors are left to polls.
+    The high-water mark only moves when the message directly follows it
+    and was pushed or queued. After a gap (missed updates, a channel never
+    polled) or a failed push the mark is left for the catch-up poll, which
+    fetches everything above it.
+    """
+    run = _ChannelRun(channel, datetime.now(timezone.utc) - timedelta(days=config.LOOKBACK_DAYS))
+    run.handle_page([message])
+    run._settle(run.batcher.flush())
+    cursors = {}
+    if message.id == run.max_message_id + 1 and run.stop_reason is None and not run.failed_ids:
+        cursors["max_message_id"] = message.id
+    if run.post_times:
+        cursors["recent_posts"] = run.recent_posts()
+    if cursors:
+        run.state.checkpoint(channel, cursors=cursors)
+    return run.saved_count
+
+
+def store_backfilled_messages(channel, messages, account=None):
+    """Store and push a batch of older ``messages`` of ``channel``.
+
+    Messages go through the same seen-check, archive and outbox as polled
+    ones, but polling cursors are left alone and a "known" answer from
+    the backend does not stop the batch. Returns how many were saved and
+    the id of the first message whose direct push failed, or None.
+    """
+    run = _ChannelRun(channel, None, account)
+    for message in messages:
+        if message is None or message.id is None or message.date is None:
+            continue
+        run._store(message, str(message.id))
+    run._settle(run.batcher.flush())
+    return run.saved_count, min(run.failed_ids, default=None)
+
+
+def _catch_up_difference(client, entity, run):
+    """Difference catch-up for ``run``; return True when the history scan is still needed."""
+    if not run.use_difference:
+        full = _request(run, lambda: client(GetFullChannelRequest(entity)))
+        run.reset_pts(full.full_chat.pts)
+        return True
+    try:
+        while run.handle_difference(_request(run, lambda: client(run.difference_request(entity)))):
+            pass
+    except _PTS_ERRORS:
+        logger.warning("stored pts of %s is no longer valid, scanning history", run.channel)
+        full = _request(run, lambda: client(GetFullChannelRequest(entity)))
+        run.reset_pts(full.full_chat.pts)
+        return True
+    return run.too_long and not run.stop_reason
+
+
+async def _catch_up_difference_async(client, entity, run, scheduler):
+    if not run.use_difference:
+        full = await _request_async(run, lambda: client(GetFullChannelRequest(entity)), scheduler)
+        run.reset_pts(full.full_chat.pts)
+        return True
+    try:
+        while True:
+            difference = await _request_async(run, lambda: client(run.difference_request(entity)), scheduler)
+            if not await asyncio.to_thread(run.handle_difference, difference):
+                break
+    except _PTS_ERRORS:
+        logger.warning("stored pts of %s is no longer valid, scanning history", run.channel)
+        full = await _request_async(run, lambda: client(GetFullChannelRequest(entity)), scheduler)
+        run.reset_pts(full.full_chat.pts)
+        return True
+    return run.too_long and not run.stop_reason
+
+
+def _resolve_entity(client, run, cache):
+    try:
+        entity = _request(run, lambda: client.get_entity(run.channel))
+    except _GONE_ERRORS:
+        cache.drop(run.channel)
+        raise
+    return cache.put(run.channel, entity)
+
+
+async def _resolve_entity_async(client, run, cache, scheduler):
+    run.request_count += 1
+    try:
+        entity = await scheduler.call(run.channel, lambda: client.get_entity(run.channel))
+    except _GONE_ERRORS:
+        cache.drop(run.channel)
+        raise
+    return cache.put(run.channel, entity)
+
+
+def _fetch_pages(client, entity, run):
+    if config.CATCHUP_METHOD == "difference" and not _catch_up_difference(client, entity, run):
+        return
+    while True:
+        messages = _request(run, lambda: client.get_messages(entity, **run.history_request()))
+        if not run.handle_page(messages):
             break
 
-        offset_id = messages[-1].id
-        _sleep_with_jitter()
 
-    if stop_reason is None:
-        stop_reason = "done"
+async def _fetch_pages_async(client, entity, run, scheduler, stop_event):
+    if config.CATCHUP_METHOD == "difference" and not await _catch_up_difference_async(
+        client, entity, run, scheduler
+    ):
+        return
+    while True:
+        if stop_event is not None and stop_event.is_set():
+            run.stop_reason = "backend_pause"
+            break
+        messages = await _request_async(
+            run,
+            lambda: client.get_messages(entity, **run.history_request()),
+            scheduler,
+        )
+        if not await asyncio.to_thread(run.handle_page, messages):
+            break
+
+
+def fetch_new_posts_for_channel(client, channel, cutoff_dt, account=None):
+    """Save and push posts of ``channel`` that were not processed yet (see ``_ChannelRun``).
+
+    The channel peer comes from the entity cache of ``account`` when
+    possible; a cached peer that Telegram rejects is resolved again once.
+    """
+    run = _ChannelRun(channel, cutoff_dt, account)
+    cache = entity_cache.get_cache(account)
+    try:
+        entity = cache.get(channel)
+        cached = entity is not None
+        if not cached:
+            entity = _resolve_entity(client, run, cache)
+        try:
+            _fetch_pages(client, entity, run)
+        except _STALE_PEER_ERRORS:
+            if not cached:
+                raise
+            logger.warning("cached entity of %s was rejected, resolving again", channel)
+            _fetch_pages(client, _resolve_entity(client, run, cache), run)
+    except RPCError:
+        logger.exception("RPC error while fetching %s", channel)
+        run.stop_reason = "error"
+    except Exception:
+        logger.exception("unexpected error while fetching %s", channel)
+        run.stop_reason = "error"
+
+    return run.finish()
+
+
+async def fetch_new_posts_for_channel_async(client, channel, cutoff_dt, scheduler, stop_event=None, account=None):
+    """Async variant of ``fetch_new_posts_for_channel`` for the native async client.
+
+    API calls go through ``scheduler``, which bounds how many run at once
+    and defers only the call that hit a FloodWait. Storing and pushing a
+    page is blocking work and runs in a worker thread. Once ``stop_event``
+    is set (another channel got a pause from the backend) no further
+    pages are requested.
+    """
+    run = await asyncio.to_thread(_ChannelRun, channel, cutoff_dt, account)
+    cache = entity_cache.get_cache(account)
+    try:
+        entity = cache.get(channel)
+        cached = entity is not None
+        if not cached:
+            entity = await _resolve_entity_async(client, run, cache, scheduler)
+        try:
+            await _fetch_pages_async(client, entity, run, scheduler, stop_event)
+        except _STALE_PEER_ERRORS:
+            if not cached:
+                raise
+            logger.warning("cached entity of %s was rejected, resolving again", channel)
+            entity = await _resolve_entity_async(client, run, cache, scheduler)
+            await _fetch_pages_async(client, entity, run, scheduler, stop_event)
+    except RPCError:
+        logger.exception("RPC error while fetching %s", channel)
+        run.stop_reason = "error"
+    except Exception:
+        logger.exception("unexpected error while fetching %s", channel)
+        run.stop_reason = "error"
 
-    return saved_count, pause_requested, stop_reason
+    return await asyncio.to_thread(run.finish)
@@ -0,0 +1,108 @@
+﻿"""Per-channel polling schedule learned from posting activity."""
+
+from datetime import datetime
+import logging
+import time
+
+from . import config
+from . import storage
+
+logger = logging.getLogger(__name__)
+
+# A rate is never measured over less than this, so one burst does not pin a channel to the minimum.
+MIN_RATE_SPAN_SECONDS = 3600
+MIN_SLEEP_SECONDS = 30
+
+
+def _timestamp(value):
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        return None
+
+
+class PollSchedule:
+    """Decides which channels are due and when each should be polled next.
+
+    A channel's rate is the number of its recent post timestamps (kept by
+    the parser) divided by the time since the oldest of them, so it decays
+    by itself while the channel is silent. The base interval is the time
+    to one expected post, clamped to [``min_interval``, ``max_interval``].
+    If polling every channel at its base interval would take more than
+    ``budget_per_hour`` API calls (estimated from each channel's average
+    requests per poll), all intervals are stretched by the same factor.
+    Next poll times live in the state store, so the schedule survives
+    restarts; a channel without one is due immediately.
+    """
+
+    def __init__(self, state, min_interval, max_interval, budget_per_hour):
+        self._state = state
+        self._min_interval = min_interval
+        self._max_interval = max_interval
+        self._budget = budget_per_hour
+
+    def due(self, channels, now=None):
+        """Channels whose next poll time has passed, the longest overdue first."""
+        now = time.time() if now is None else now
+        due = []
+        for channel in channels:
+            next_at = self._state.get_cursor(channel, "next_poll_at")
+            if next_at is None or next_at <= now:
+                due.append((next_at or 0, channel))
+        return [channel for _, channel in sorted(due)]
+
+    def base_interval(self, recent_posts, now):
+        if not recent_posts:
+            return self._max_interval
+        span = max(now - min(recent_posts), MIN_RATE_SPAN_SECONDS)
+        rate = len(recent_posts) / span
+        return min(max(1 / rate, self._min_interval), self._max_interval)
+
+    def plan(self, channels, now=None):
+        """Store the next poll time of every channel; return seconds until the first one."""
+        now = time.time() if now is None else now
+        entries = []
+        demand = 0.0
+        for channel in channels:
+            cursors = self._state.all_cursors(channel)
+            interval = self.base_interval(cursors.get("recent_posts") or [], now)
+            requests = cursors.get("requests_per_poll") or 1.0
+            demand += requests * 3600 / interval
+            entries.append((channel, _timestamp(cursors.get("last_run_at")) or now, interval))
+
+        stretch = max(demand / self._budget, 1.0) if self._budget > 0 else 1.0
+        next_times = []
+        for channel, last_run, interval in entries:
+            next_at = last_run + interval * stretch
+            self._state.set_cursor(channel, "next_poll_at", next_at)
+            next_times.append(next_at)
+
+        logger.info(
+            "poll schedule: %.0f api calls per hour wanted, budget %s, intervals stretched x%.2f",
+            demand,
+            self._budget,
+            stretch,
+        )
+        if not next_times:
+            return self._max_interval
+        return min(max(min(next_times) - now, MIN_SLEEP_SECONDS), self._max_interval)
+
+
+def get_schedule():
+    return PollSchedule(
+        storage.open_state_store(),
+        config.POLL_MIN_MINUTES * 60,
+        config.POLL_MAX_MINUTES * 60,
+        config.API_BUDGET_PER_HOUR,
+    )
+
+
+def due_channels(channels):
+    """``channels`` narrowed to the due ones when ``ADAPTIVE_POLLING`` is on."""
+    if not config.ADAPTIVE_POLLING:
+        return channels
+    due = get_schedule().due(channels)
+    logger.info("%s of %s channels due", len(due), len(channels))
+    return due
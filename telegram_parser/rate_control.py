@@ -0,0 +1,148 @@
+﻿"""AIMD pacing of Telegram API calls, one controller per account."""
+
+import asyncio
+import logging
+import threading
+import time
+
+from . import config
+from . import storage
+from .sharding import shard_name
+
+logger = logging.getLogger(__name__)
+
+# Not a valid channel username, so it cannot clash with a channel namespace.
+NAMESPACE = "rate-control"
+SAVE_EVERY_SECONDS = 60
+
+
+class RateController:
+    """Spaces API calls of one account at ``rate`` calls per second.
+
+    Every successful call raises the rate by ``increase / rate``, so under
+    steady traffic it grows by about ``increase`` calls per second each
+    second. A FloodWait multiplies it by ``decrease``. The rate stays in
+    [``min_rate``, ``max_rate``]. The current rate, the rate at the last
+    FloodWait and the safe rate (the highest rate that has gone
+    ``SAFE_AFTER_CALLS`` calls without a FloodWait) are stored in the
+    state store, and a restarted parser resumes from the stored rate.
+    """
+
+    SAFE_AFTER_CALLS = 50
+
+    def __init__(self, state, account, initial_rate, min_rate, max_rate, increase, decrease):
+        self._state = state
+        self.account = account
+        self._min_rate = min_rate
+        self._max_rate = max_rate
+        self._increase = increase
+        self._decrease = decrease
+        self._lock = threading.Lock()
+
+        saved = state.get_cursor(NAMESPACE, account) or {}
+        self.rate = min(max(saved.get("rate", initial_rate), min_rate), max_rate)
+        self.safe_rate = saved.get("safe_rate", 0.0)
+        self.flood_rate = saved.get("flood_rate")
+        self.flood_waits = saved.get("flood_waits", 0)
+        self._calm_calls = 0
+        self._next_slot = 0.0
+        self._saved_at = time.monotonic()
+
+    def _reserve(self):
+        """Claim the next send slot; return how long the caller must wait for it."""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next_slot, now)
+            self._next_slot = slot + 1.0 / self.rate
+            return slot - now
+
+    def acquire(self):
+        delay = self._reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    async def acquire_async(self):
+        delay = self._reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def on_success(self):
+        with self._lock:
+            self.rate = min(self.rate + self._increase / self.rate, self._max_rate)
+            self._calm_calls += 1
+            if self._calm_calls >= self.SAFE_AFTER_CALLS:
+                self.safe_rate = max(self.safe_rate, self.rate)
+            save = time.monotonic() - self._saved_at >= SAVE_EVERY_SECONDS
+        if save:
+            self.save()
+
+    def on_flood_wait(self, seconds):
+        with self._lock:
+            self.flood_rate = self.rate
+            self.flood_waits += 1
+            self.rate = max(self.rate * self._decrease, self._min_rate)
+            if self._calm_calls < self.SAFE_AFTER_CALLS:
+                # The safe rate was not safe after all.
+                self.safe_rate = min(self.safe_rate, self.rate)
+            self._calm_calls = 0
+        logger.warning(
+            "FloodWait of %s seconds at %.2f calls/s for %s, backing off to %.2f calls/s",
+            seconds,
+            self.flood_rate,
+            self.account,
+            self.rate,
+        )
+        self.save()
+
+    def save(self):
+        with self._lock:
+            self._saved_at = time.monotonic()
+            value = {
+                "rate": self.rate,
+                "safe_rate": self.safe_rate,
+                "flood_rate": self.flood_rate,
+                "flood_waits": self.flood_waits,
+            }
+        self._state.set_cursor(NAMESPACE, self.account, value)
+
+    def log_summary(self, log):
+        log.info(
+            "account %s: %.2f calls/s, safe rate %.2f calls/s, last FloodWait at %s, %s FloodWaits in total",
+            self.account,
+            self.rate,
+            self.safe_rate,
+            "-" if self.flood_rate is None else f"{self.flood_rate:.2f} calls/s",
+            self.flood_waits,
+        )
+
+
+_controllers = {}
+_controllers_lock = threading.Lock()
+
+
+def get_controller(account=None):
+    """Process-wide controller of ``account`` (a shard name; None for ``SESSION_PATH``)."""
+    name = account or shard_name(config.SESSION_PATH)
+    with _controllers_lock:
+        controller = _controllers.get(name)
+        if controller is None:
+            controller = RateController(
+                storage.open_state_store(),
+                name,
+                initial_rate=config.RATE_INITIAL,
+                min_rate=config.RATE_MIN,
+                max_rate=config.RATE_MAX,
+                increase=config.RATE_INCREASE,
+                decrease=config.RATE_DECREASE,
+            )
+            _controllers[name] = controller
+        return controller
+
+
+def log_rates(log):
+    """Save and log the state of every controller used in this process."""
+    with _controllers_lock:
+        controllers = list(_controllers.values())
+    for controller in controllers:
+        controller.save()
+        controller.log_summary(log)
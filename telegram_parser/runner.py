@@ -6,9 +6,17 @@ import time
 
 from telethon.sync import TelegramClient
 
+from jsonl_writer import exit_on_sigterm
+from news_api import log_timing_summary
+from news_dedup import log_pair_stats
+from . import async_runner
 from . import config
+from . import entity_cache
 from . import parser as tg_parser
+from . import poll_schedule
+from . import rate_control
 from . import storage
+from . import stream
 
 
 def _setup_logging():
@@ -37,6 +45,7 @@ def _run_iteration() -> bool:
 
     channels = storage.load_channels(config.CHANNELS_PATH)
     logger.info("loaded %s channels", len(channels))
+    channels = poll_schedule.due_channels(channels)
 
     session_path = config.resolve_path(config.SESSION_PATH)
     session_path.parent.mkdir(parents=True, exist_ok=True)
@@ -45,7 +54,8 @@ def _run_iteration() -> bool:
 
     total_saved = 0
     pause_requested = False
-    client = TelegramClient(str(session_path), config.API_ID, config.API_HASH)
+    # FloodWaits must reach the rate controller, not be slept through inside the client.
+    client = TelegramClient(str(session_path), config.API_ID, config.API_HASH, flood_sleep_threshold=0)
     try:
         client.connect()
         if client.is_user_authorized():
@@ -93,22 +103,42 @@ def _run_iteration() -> bool:
     finally:
         client.disconnect()
 
-    logger.info("iteration complete, new posts: %s", total_saved)
+    logger.info(
+        "iteration complete, new posts: %s, entity cache hits: %s",
+        total_saved,
+        entity_cache.hit_rate_text(),
+    )
+    tg_parser.log_fetch_summary(logger)
+    rate_control.log_rates(logger)
+    log_timing_summary(logger)
+    log_pair_stats(logger, "https://t.me/")
     return pause_requested
 
 
 def run_forever():
     _setup_logging()
+    exit_on_sigterm()
     logger = logging.getLogger(__name__)
+    if config.RUN_MODE == "stream":
+        stream.run_forever()
+        return
     while True:
         try:
-            pause_requested = _run_iteration()
+            if config.RUN_MODE == "async" or config.SHARD_SESSION_PATHS:
+                pause_requested = async_runner.run_iteration()
+            else:
+                pause_requested = _run_iteration()
         except Exception:
             logger.exception("telegram parser iteration failed")
             raise
         if pause_requested:
             logger.info("sleeping for 5 minutes due to backend response")
             time.sleep(5 * 60)
+        elif config.ADAPTIVE_POLLING:
+            channels = storage.load_channels(config.CHANNELS_PATH)
+            sleep_seconds = poll_schedule.get_schedule().plan(channels)
+            logger.info("next channel due in %.0f seconds", sleep_seconds)
+            time.sleep(sleep_seconds)
         else:
             logger.info("sleeping for %s minutes", config.POLL_INTERVAL_MINUTES)
             time.sleep(config.POLL_INTERVAL_MINUTES * 60)
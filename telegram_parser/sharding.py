@@ -0,0 +1,45 @@
+﻿"""Consistent hashing of channels onto session shards."""
+
+import bisect
+import hashlib
+from pathlib import Path
+
+VIRTUAL_NODES = 256
+
+
+def _hash(value):
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def shard_name(session_path):
+    """Stable shard name: the session file name without directories or suffix."""
+    return Path(session_path).stem
+
+
+class HashRing:
+    """Each node owns ``replicas`` points on a ring; a key goes to the next point clockwise.
+
+    Adding a node only takes over the keys that now fall just before its
+    points, about ``1 / len(nodes)`` of them; removing a node only moves
+    the keys it owned.
+    """
+
+    def __init__(self, nodes, replicas=VIRTUAL_NODES):
+        points = sorted((_hash(f"{node}#{index}"), node) for node in nodes for index in range(replicas))
+        self._hashes = [point for point, _ in points]
+        self._nodes = [node for _, node in points]
+
+    def node_for(self, key):
+        if not self._nodes:
+            raise ValueError("hash ring has no nodes")
+        index = bisect.bisect(self._hashes, _hash(key)) % len(self._hashes)
+        return self._nodes[index]
+
+
+def assign_channels(channels, nodes):
+    """``{node: [channels]}`` for every node, channels in their original order."""
+    ring = HashRing(nodes)
+    shards = {node: [] for node in nodes}
+    for channel in channels:
+        shards[ring.node_for(channel.lower())].append(channel)
+    return shards
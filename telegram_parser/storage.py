@@ -1,56 +1,58 @@
 ﻿"""File storage utilities for index and JSONL output."""
 
 from pathlib import Path
-import json
 import logging
-import os
 
+from jsonl_writer import get_writer
+from segment_store import open_store
+from sqlite_store import ENGINE_SQLITE, open_database
+from state_store import open_state
 from . import config
 from . import utils
 
 logger = logging.getLogger(__name__)
 
 
-def load_index(path):
-    path = config.resolve_path(path)
-    if not path.exists():
-        return set()
-    entries = set()
-    with path.open("r", encoding="utf-8") as handle:
-        for line in handle:
-            value = line.strip()
-            if value:
-                entries.add(value)
-    return entries
-
+def open_state_store():
+    """Seen message ids and per-channel cursors, shared by all channels of this parser."""
+    return open_state(config.resolve_path(config.STATE_PATH))
 
-def append_jsonl(path, record):
-    path = Path(path)
-    path.parent.mkdir(parents=True, exist_ok=True)
-    with path.open("a", encoding="utf-8") as handle:
-        handle.write(json.dumps(record, ensure_ascii=False))
-        handle.write("\n")
-        handle.flush()
-        os.fsync(handle.fileno())
 
+def append_jsonl(path, record, index=False):
+    writer = get_writer(
+        Path(path),
+        mode=config.FSYNC_MODE,
+        fsync_every=config.FSYNC_EVERY,
+        fsync_interval=config.FSYNC_INTERVAL_SECONDS,
+        index=index,
+    )
+    writer.write(record)
 
-def write_event(path, status, item, error_message=None):
-    event = {
-        "recorded_at": utils.utc_now_iso(),
-        "status": status,
-        "item": item,
-    }
-    if error_message:
-        event["error_message"] = error_message
-    append_jsonl(path, event)
 
-
-def append_index_key(path, key):
-    path = config.resolve_path(path)
-    path.parent.mkdir(parents=True, exist_ok=True)
-    with path.open("a", encoding="utf-8") as handle:
-        handle.write(key)
-        handle.write("\n")
+def append_post(path, record):
+    """Store a collected post in OUTPUT_PATH, the segment archive or SQLite, per config."""
+    if config.STORAGE_ENGINE == ENGINE_SQLITE:
+        database = open_database(
+            config.resolve_path(config.SQLITE_PATH),
+            batch_size=config.FSYNC_EVERY,
+            flush_interval=config.FSYNC_INTERVAL_SECONDS,
+        )
+        database.write(record)
+        return
+    if not config.SEGMENTED_STORAGE:
+        append_jsonl(path, record, index=config.OFFSET_INDEX)
+        return
+    store = open_store(
+        config.resolve_path(config.SEGMENTS_DIR),
+        Path(path).stem,
+        max_bytes=config.SEGMENT_MAX_MB * 1024 * 1024,
+        compression=config.SEGMENT_COMPRESSION,
+        retention_days=config.RETENTION_DAYS,
+        fsync_mode=config.FSYNC_MODE,
+        fsync_every=config.FSYNC_EVERY,
+        fsync_interval=config.FSYNC_INTERVAL_SECONDS,
+    )
+    store.write(record)
 
 
 def load_channels(path):
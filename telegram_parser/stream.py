@@ -0,0 +1,123 @@
+﻿"""Streaming run mode: NewMessage updates over one connection plus a catch-up poll."""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+import logging
+
+from telethon import events
+from telethon.utils import get_peer_id
+
+from news_api import log_timing_summary
+from news_dedup import log_pair_stats
+from . import config
+from . import entity_cache
+from . import parser as tg_parser
+from . import rate_control
+from . import storage
+from .api_scheduler import RequestScheduler
+from .async_runner import authorize, create_client
+
+logger = logging.getLogger(__name__)
+
+RECONNECT_DELAY_SECONDS = 30
+
+
+async def _resolve_peers(client, channels, scheduler):
+    cache = entity_cache.get_cache()
+    peers = {}
+    for channel in channels:
+        entity = cache.get(channel)
+        if entity is None:
+            try:
+                entity = await scheduler.call(channel, lambda channel=channel: client.get_input_entity(channel))
+            except Exception:
+                logger.exception("failed to resolve channel entity: %s", channel)
+                continue
+            entity = cache.put(channel, entity)
+        peers[get_peer_id(entity)] = channel
+    return peers
+
+
+async def _catch_up(client, channels, scheduler, locks):
+    cutoff_dt = datetime.now(timezone.utc) - timedelta(days=config.LOOKBACK_DAYS)
+
+    async def _one(channel):
+        async with locks[channel]:
+            saved_count, _, reason = await tg_parser.fetch_new_posts_for_channel_async(
+                client,
+                channel,
+                cutoff_dt,
+                scheduler,
+            )
+        if saved_count:
+            logger.info("catch-up %s: %s new posts, stop reason=%s", channel, saved_count, reason)
+        return saved_count
+
+    saved = await asyncio.gather(*(_one(channel) for channel in channels))
+    logger.info(
+        "catch-up complete, new posts: %s, entity cache hits: %s",
+        sum(saved),
+        entity_cache.hit_rate_text(),
+    )
+    tg_parser.log_fetch_summary(logger)
+    scheduler.log_summary()
+    rate_control.log_rates(logger)
+    log_timing_summary(logger)
+    log_pair_stats(logger, "https://t.me/")
+
+
+async def _catch_up_loop(client, channels, scheduler, locks):
+    while True:
+        try:
+            await _catch_up(client, channels, scheduler, locks)
+        except Exception:
+            logger.exception("catch-up poll failed")
+        await asyncio.sleep(config.STREAM_CATCHUP_MINUTES * 60)
+
+
+async def _session(channels):
+    """Run until the connection is lost for good; the first catch-up fills the gap before it."""
+    scheduler = RequestScheduler(config.MAX_CONCURRENT_REQUESTS, rate_control.get_controller())
+    locks = {channel: asyncio.Lock() for channel in channels}
+    client = create_client()
+    try:
+        await authorize(client)
+        peers = await _resolve_peers(client, channels, scheduler)
+        logger.info("streaming %s of %s channels", len(peers), len(channels))
+
+        async def _on_message(event):
+            channel = peers.get(event.chat_id)
+            if channel is None or event.message is None:
+                return
+            async with locks[channel]:
+                saved_count = await asyncio.to_thread(tg_parser.store_streamed_message, channel, event.message)
+            if saved_count:
+                logger.info("streamed %s/%s", channel, event.message.id)
+
+        client.add_event_handler(_on_message, events.NewMessage(chats=list(peers)))
+        catch_up = asyncio.create_task(_catch_up_loop(client, channels, scheduler, locks))
+        try:
+            await client.disconnected
+        finally:
+            catch_up.cancel()
+    finally:
+        await client.disconnect()
+
+
+async def _run():
+    channels = storage.load_channels(config.CHANNELS_PATH)
+    logger.info("loaded %s channels", len(channels))
+    while True:
+        try:
+            await _session(channels)
+            logger.warning("connection lost, reconnecting in %s seconds", RECONNECT_DELAY_SECONDS)
+        except RuntimeError:
+            # Login problems, as in the polling modes; retrying would only request more codes.
+            raise
+        except Exception:
+            logger.exception("streaming session failed, reconnecting in %s seconds", RECONNECT_DELAY_SECONDS)
+        await asyncio.sleep(RECONNECT_DELAY_SECONDS)
+
+
+def run_forever():
+    asyncio.run(_run())
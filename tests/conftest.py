@@ -0,0 +1,5 @@
+import os
+
+# telegram_parser.config reads these at import time and raises without them.
+os.environ.setdefault("NEWS_API_URL", "http://127.0.0.1:9/test/save_news")
+os.environ.setdefault("NEWS_API_TIMEOUT", "1")
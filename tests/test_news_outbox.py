@@ -0,0 +1,112 @@
+import json
+
+import pytest
+
+import news_outbox
+from news_api import PushFailure
+
+
+class FakeBackend:
+    """Stands in for ``push_news_batch_detailed``; answers with the next scripted outcome per header."""
+
+    def __init__(self, script):
+        self.script = {header: list(outcomes) for header, outcomes in script.items()}
+        self.pushed = []
+
+    def __call__(self, items, logger=None, batch_size=None):
+        self.pushed.append([item["header"] for item in items])
+        results = []
+        for item in items:
+            outcomes = self.script.get(item["header"])
+            results.append(outcomes.pop(0) if outcomes else {"created": True})
+        return results
+
+
+@pytest.fixture
+def outbox(tmp_path, monkeypatch):
+    monkeypatch.setattr(news_outbox, "MAX_BACKOFF_SECONDS", 0)
+    monkeypatch.setattr(news_outbox, "IDLE_POLL_SECONDS", 0)
+    return news_outbox.Outbox(tmp_path / "outbox")
+
+
+def _drain(outbox, rounds):
+    batch = None
+    for _ in range(rounds):
+        batch = outbox._drain_once(batch)
+    return batch
+
+
+def _dead_headers(outbox):
+    path = outbox.directory / "dead_letter.jsonl"
+    if not path.exists():
+        return []
+    return [json.loads(line)["header"] for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def test_only_failed_items_are_pushed_again(outbox, monkeypatch):
+    backend = FakeBackend({"b": [PushFailure(), PushFailure(503)]})
+    monkeypatch.setattr(news_outbox, "push_news_batch_detailed", backend)
+    for header in ("a", "b", "c"):
+        outbox.add({"header": header})
+
+    assert _drain(outbox, 3) is None
+
+    assert backend.pushed == [["a", "b", "c"], ["b"], ["b"]]
+    assert outbox.sent == 3
+    assert outbox._read_batch(10)[0] == []
+
+
+def test_transient_failures_are_retried_past_any_attempt_limit(outbox, monkeypatch):
+    backend = FakeBackend({"a": [PushFailure()] * 25})
+    monkeypatch.setattr(news_outbox, "push_news_batch_detailed", backend)
+    outbox.add({"header": "a"})
+
+    batch = _drain(outbox, 25)
+
+    assert batch is not None and batch.attempts == 25
+    assert _dead_headers(outbox) == []
+    assert _drain(outbox, 1) is None
+    assert outbox.sent == 1
+
+
+def test_only_permanent_rejections_are_dead_lettered(outbox, monkeypatch):
+    backend = FakeBackend({"bad": [PushFailure.from_status(422)], "later": [PushFailure.from_status(429)]})
+    monkeypatch.setattr(news_outbox, "push_news_batch_detailed", backend)
+    for header in ("ok", "bad", "later"):
+        outbox.add({"header": header})
+
+    assert _drain(outbox, 2) is None
+
+    assert backend.pushed == [["ok", "bad", "later"], ["later"]]
+    assert _dead_headers(outbox) == ["bad"]
+    assert outbox.sent == 2
+
+
+def test_redrive_requeues_dead_letters(outbox, monkeypatch):
+    backend = FakeBackend({"bad": [PushFailure.from_status(400)]})
+    monkeypatch.setattr(news_outbox, "push_news_batch_detailed", backend)
+    outbox.add({"header": "bad"})
+    _drain(outbox, 1)
+
+    assert news_outbox.request_redrive(outbox.directory) == 1
+    assert _dead_headers(outbox) == []
+    with pytest.raises(RuntimeError):
+        news_outbox.request_redrive(outbox.directory)
+
+    assert _drain(outbox, 1) is None
+    assert backend.pushed[-1] == ["bad"]
+    assert outbox.sent == 1
+    assert not (outbox.directory / "redrive.jsonl").exists()
+
+
+def test_unsettled_batch_is_resent_after_restart(tmp_path, monkeypatch):
+    monkeypatch.setattr(news_outbox, "MAX_BACKOFF_SECONDS", 0)
+    backend = FakeBackend({"b": [PushFailure()]})
+    monkeypatch.setattr(news_outbox, "push_news_batch_detailed", backend)
+    first = news_outbox.Outbox(tmp_path)
+    first.add({"header": "a"})
+    first.add({"header": "b"})
+    assert first._drain_once(None) is not None
+
+    restarted = news_outbox.Outbox(tmp_path)
+    assert [item["header"] for item in restarted._read_batch(10)[0]] == ["a", "b"]
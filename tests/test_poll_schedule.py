@@ -0,0 +1,71 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from state_store import StateStore
+from telegram_parser.poll_schedule import MIN_SLEEP_SECONDS, PollSchedule
+
+NOW = datetime(2024, 1, 1, 12, tzinfo=timezone.utc).timestamp()
+
+
+@pytest.fixture
+def state(tmp_path):
+    store = StateStore(tmp_path / "state.sqlite3")
+    yield store
+    store.close()
+
+
+def _last_run(seconds_ago):
+    return datetime.fromtimestamp(NOW - seconds_ago, timezone.utc).isoformat()
+
+
+def test_due_channels_longest_overdue_first(state):
+    state.set_cursor("late", "next_poll_at", NOW - 600)
+    state.set_cursor("later", "next_poll_at", NOW - 60)
+    state.set_cursor("waiting", "next_poll_at", NOW + 60)
+    schedule = PollSchedule(state, 60, 3600, 1000)
+
+    assert schedule.due(["waiting", "later", "new", "late"], now=NOW) == ["new", "late", "later"]
+
+
+def test_base_interval_follows_post_rate_within_bounds(state):
+    schedule = PollSchedule(state, 60, 3600, 1000)
+
+    assert schedule.base_interval([], NOW) == 3600
+    # Six posts over two hours: one every twenty minutes.
+    assert schedule.base_interval([NOW - 7200 + i for i in range(6)], NOW) == pytest.approx(1200)
+    # A burst is measured over at least MIN_RATE_SPAN_SECONDS, then clamped to the minimum.
+    assert schedule.base_interval([NOW - i for i in range(120)], NOW) == 60
+
+
+def test_plan_stores_next_poll_from_last_run(state):
+    state.set_cursor("busy", "recent_posts", [NOW - 3600 + i for i in range(6)])
+    state.set_cursor("busy", "last_run_at", _last_run(100))
+    schedule = PollSchedule(state, 60, 3600, 1000)
+
+    sleep = schedule.plan(["busy", "quiet"], now=NOW)
+
+    assert state.get_cursor("busy", "next_poll_at") == pytest.approx(NOW - 100 + 600)
+    assert state.get_cursor("quiet", "next_poll_at") == pytest.approx(NOW + 3600)
+    assert sleep == pytest.approx(500)
+
+
+def test_plan_stretches_intervals_over_budget(state):
+    for channel in ("a", "b"):
+        state.set_cursor(channel, "recent_posts", [NOW - 3600 + i for i in range(60)])
+        state.set_cursor(channel, "requests_per_poll", 2.0)
+        state.set_cursor(channel, "last_run_at", _last_run(0))
+    # Each channel wants a poll a minute at two calls each: 240 calls an hour against 120.
+    schedule = PollSchedule(state, 60, 3600, 120)
+
+    sleep = schedule.plan(["a", "b"], now=NOW)
+
+    assert state.get_cursor("a", "next_poll_at") == pytest.approx(NOW + 120)
+    assert sleep == pytest.approx(120)
+
+
+def test_plan_never_sleeps_less_than_minimum(state):
+    state.set_cursor("overdue", "last_run_at", _last_run(7200))
+    schedule = PollSchedule(state, 60, 3600, 1000)
+
+    assert schedule.plan(["overdue"], now=NOW) == MIN_SLEEP_SECONDS
@@ -0,0 +1,77 @@
+import pytest
+
+from state_store import StateStore
+from telegram_parser import rate_control
+from telegram_parser.rate_control import RateController
+
+
+@pytest.fixture
+def state(tmp_path):
+    store = StateStore(tmp_path / "state.sqlite3")
+    yield store
+    store.close()
+
+
+def _controller(state, initial_rate=1.0):
+    return RateController(state, "acc", initial_rate, min_rate=0.5, max_rate=4.0, increase=1.0, decrease=0.5)
+
+
+def test_success_raises_rate_additively_up_to_max(state):
+    controller = _controller(state)
+
+    controller.on_success()
+    assert controller.rate == pytest.approx(2.0)
+    controller.on_success()
+    assert controller.rate == pytest.approx(2.5)
+
+    for _ in range(100):
+        controller.on_success()
+    assert controller.rate == 4.0
+
+
+def test_flood_wait_halves_rate_down_to_min(state):
+    controller = _controller(state, initial_rate=3.0)
+
+    controller.on_flood_wait(5)
+    assert controller.rate == pytest.approx(1.5)
+    assert controller.flood_rate == pytest.approx(3.0)
+
+    controller.on_flood_wait(5)
+    controller.on_flood_wait(5)
+    assert controller.rate == 0.5
+    assert controller.flood_waits == 3
+
+
+def test_safe_rate_needs_calm_calls_and_drops_on_an_early_flood_wait(state):
+    controller = _controller(state)
+    for _ in range(RateController.SAFE_AFTER_CALLS - 1):
+        controller.on_success()
+    assert controller.safe_rate == 0.0
+
+    controller.on_success()
+    assert controller.safe_rate == controller.rate == 4.0
+
+    # After enough calm calls the FloodWait does not discredit the safe rate...
+    controller.on_flood_wait(1)
+    assert controller.safe_rate == 4.0
+    # ...but a second one right after it does.
+    controller.on_flood_wait(1)
+    assert controller.safe_rate == pytest.approx(1.0)
+
+
+def test_calls_are_spaced_at_current_rate(state, monkeypatch):
+    monkeypatch.setattr(rate_control.time, "monotonic", lambda: 100.0)
+    controller = _controller(state, initial_rate=2.0)
+
+    assert [controller._reserve() for _ in range(3)] == pytest.approx([0.0, 0.5, 1.0])
+
+
+def test_restarted_controller_resumes_saved_rates(state):
+    controller = _controller(state, initial_rate=3.0)
+    controller.on_flood_wait(1)
+
+    resumed = _controller(state)
+
+    assert resumed.rate == pytest.approx(1.5)
+    assert resumed.flood_rate == pytest.approx(3.0)
+    assert resumed.flood_waits == 1
@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+from datetime import datetime, timezone
+
+
+def parse_utc(value) -> datetime | None:
+    """Aware UTC datetime from a datetime or an ISO string; naive means UTC, None if missing or invalid."""
+    if isinstance(value, datetime):
+        parsed = value
+    else:
+        if not value:
+            return None
+        try:
+            parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if parsed.tzinfo is None:
+        return parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+def utc_stamp(value) -> str:
+    """Second-precision UTC ISO string ('' if missing or invalid).
+
+    The stamps are fixed width, so date ranges compare correctly as text;
+    the offset index, the segment manifest and the SQLite store rely on it.
+    """
+    parsed = parse_utc(value)
+    return parsed.isoformat(timespec="seconds") if parsed is not None else ""